@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from flaskr import create_app, db
+from flaskr.config import Config
+
+def benchmark_config(database_uri=None):
+    """Config pointing at a throwaway database (a temp SQLite file by default)."""
+    if database_uri is None:
+        database_uri = os.environ.get("BENCHMARK_DATABASE_URI")
+    if database_uri is None:
+        handle, path = tempfile.mkstemp(prefix="reviewlens-bench-", suffix=".db")
+        os.close(handle)
+        database_uri = f"sqlite:///{path}"
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_uri
+
+    return BenchmarkConfig
+
+def create_benchmark_app(database_uri=None):
+    """Build the Flask app against a throwaway database (a temp SQLite file by default)."""
+    app = create_app(benchmark_config(database_uri))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+@contextmanager
+def timed(results: dict, name: str, rows: int, trace_memory: bool = False):
+    """Record the block's duration and throughput, and optionally its peak Python allocations.
+
+    Memory tracing slows the block down and does not see child processes.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "rows": rows,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(rows / elapsed) if elapsed > 0 else None
+        }
+        if trace_memory:
+            results[name]["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+            tracemalloc.stop()
+
+def print_results(results: dict) -> None:
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        line = f"{name:<{width}}  {result['rows']:>8} rows  {result['seconds']:>8.3f}s  {result['rows_per_sec']:>10} rows/sec"
+        if "peak_mb" in result:
+            line += f"  {result['peak_mb']:>8.1f} MB peak"
+        print(line)
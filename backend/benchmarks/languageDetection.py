@@ -0,0 +1,72 @@
+"""Compare accuracy and speed of plain langdetect against the tiered detector.
+
+Run from backend/:
+    python -m benchmarks.languageDetection --texts 5000
+The sample is synthetic reviews (English plus es/fr/de) and a fixed set of
+short, non-Latin and mixed texts, each labeled with its language.
+"""
+import argparse
+import time
+from flaskr.services import languageDetection
+from flaskr.services.languageDetection import full_detect_language, prefilter_language, language_cache
+from .syntheticReviews import generate_labeled_texts
+
+EDGE_CASES = [
+    ("en", "good"),
+    ("en", "works"),
+    ("en", "not bad at all"),
+    ("en", "Crashes every time I open it!!!"),
+    ("en", "5 stars"),
+    ("ru", "приложение постоянно вылетает"),
+    ("ja", "アプリがすぐに落ちます"),
+    ("ko", "앱이 자꾸 꺼져요"),
+    ("pt", "o aplicativo é muito bom, recomendo"),
+    ("it", "l'applicazione non funziona più dopo l'aggiornamento"),
+    ("es", "no funciona"),
+    ("fr", "nul"),
+]
+
+def measure(name: str, detect, sample, results: dict) -> None:
+    start = time.perf_counter()
+    predictions = [detect(text) for _, text in sample]
+    elapsed = time.perf_counter() - start
+
+    results[name] = {
+        "texts": len(sample),
+        "ms_per_text": round(elapsed * 1000 / len(sample), 4),
+        "accuracy": round(sum(p == label for p, (label, _) in zip(predictions, sample)) / len(sample), 4),
+        "english_accuracy": round(sum((p == "en") == (label == "en") for p, (label, _) in zip(predictions, sample)) / len(sample), 4),
+    }
+
+def run(texts: int) -> dict:
+    sample = generate_labeled_texts(texts) + EDGE_CASES
+    results = {}
+
+    measure("langdetect", full_detect_language, sample, results)
+
+    language_cache.clear()
+    uncached = lambda text: prefilter_language(text) or full_detect_language(text)
+    measure("tiered", uncached, sample, results)
+    results["tiered"]["prefiltered"] = round(sum(prefilter_language(text) is not None for _, text in sample) / len(sample), 4)
+
+    language_cache.clear()
+    measure("tiered+cache (cold)", languageDetection.detect_language, sample, results)
+    measure("tiered+cache (warm)", languageDetection.detect_language, sample, results)
+
+    return results
+
+def print_results(results: dict) -> None:
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        line = (f"{name:<{width}}  {result['texts']:>7} texts  {result['ms_per_text']:>9.4f} ms/text  "
+                f"accuracy {result['accuracy']:.4f}  en/non-en {result['english_accuracy']:.4f}")
+        if "prefiltered" in result:
+            line += f"  prefiltered {result['prefiltered']:.1%}"
+        print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=5000)
+    args = parser.parse_args()
+
+    print_results(run(args.texts))
@@ -0,0 +1,68 @@
+"""Per-stage throughput and peak memory of the processing pipeline on synthetic apps.
+
+Run from backend/:
+    python -m benchmarks.pipeline --sizes 1000 10000 100000
+Reviews come from a stubbed Google Play source, so no network is needed. Each
+size runs extract_reviews, analyze_sentiment, extract_topics and
+link_topics_reviews (or, with --fused, the single annotate_reviews pass in
+place of the middle two) against a fresh database: a temp SQLite file, or
+BENCHMARK_DATABASE_URI / --database-uri for a throwaway Postgres. Stages run
+in one process by default (--workers 1) so peak memory covers all the work;
+pass --json to keep results for comparing runs.
+"""
+import argparse
+import json
+from flaskr.services.reviewExtraction import extract_reviews
+from flaskr.services.sentimentAnalysis import analyze_sentiment
+from flaskr.services.topicExtraction import extract_topics
+from flaskr.services.reviewAnnotation import annotate_reviews
+from flaskr.services.reviewTopicLinkage import link_topics_reviews
+from .harness import create_benchmark_app, timed, print_results
+from .stubPlayStore import StubPlayStore
+
+BENCH_APP_ID = "com.reviewlens.benchmark"
+
+def run_size(size: int, database_uri=None, foreign_ratio: float = 0.1, rating_weights=None,
+             workers: int = 1, trace_memory: bool = True, fused: bool = False) -> dict:
+    app = create_benchmark_app(database_uri)
+    store = StubPlayStore(BENCH_APP_ID, size, foreign_ratio, rating_weights)
+    stages = [("review_extraction", lambda: extract_reviews(BENCH_APP_ID, limit=size, incremental=False, source=store))]
+    if fused:
+        stages.append(("annotation", lambda: annotate_reviews(BENCH_APP_ID, workers=workers)))
+    else:
+        stages.append(("sentiment_analysis", lambda: analyze_sentiment(BENCH_APP_ID, workers=workers)))
+        stages.append(("topic_extraction", lambda: extract_topics(BENCH_APP_ID, workers=workers)))
+    stages.append(("topic_linkage", lambda: link_topics_reviews(BENCH_APP_ID)))
+
+    results = {}
+    with app.app_context():
+        for stage, run_stage in stages:
+            with timed(results, f"{size}/{stage}", size, trace_memory):
+                run_stage()
+    return results
+
+def run(sizes, database_uri=None, foreign_ratio: float = 0.1, rating_weights=None,
+        workers: int = 1, trace_memory: bool = True, fused: bool = False) -> dict:
+    results = {}
+    for size in sizes:
+        results.update(run_size(size, database_uri, foreign_ratio, rating_weights, workers, trace_memory, fused))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--foreign-ratio", type=float, default=0.1, help="share of es/fr/de reviews")
+    parser.add_argument("--rating-weights", type=float, nargs=5, help="relative weight of ratings 1 to 5")
+    parser.add_argument("--workers", type=int, default=1, help="sentiment and preprocessing processes")
+    parser.add_argument("--fused", action="store_true", help="run the single annotation pass instead of separate stages")
+    parser.add_argument("--no-trace-memory", action="store_true", help="skip tracemalloc for faster timings")
+    parser.add_argument("--database-uri")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.database_uri, args.foreign_ratio, args.rating_weights,
+                  args.workers, not args.no_trace_memory, args.fused)
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
@@ -0,0 +1,42 @@
+"""Compare review write throughput of the ORM path and the bulk insert path.
+
+Run from backend/:
+    python -m benchmarks.reviewInsert --rows 30000
+Set BENCHMARK_DATABASE_URI (or --database-uri) to measure against Postgres.
+"""
+import argparse
+from flaskr import db
+from flaskr.models import App, Review
+from flaskr.services.reviewExtraction import write_reviews
+from .harness import create_benchmark_app, timed, print_results
+from .syntheticReviews import generate_review_rows
+
+BENCH_APP_ID = "com.reviewlens.benchmark"
+
+def run(rows: int, batch_limit: int, database_uri=None) -> dict:
+    app = create_benchmark_app(database_uri)
+    review_rows = generate_review_rows(BENCH_APP_ID, rows)
+    results = {}
+
+    with app.app_context():
+        db.session.add(App(id=BENCH_APP_ID, name="Benchmark", description=""))
+        db.session.commit()
+
+        for mode, bulk in (("orm", False), ("bulk", True)):
+            Review.query.filter_by(app_id=BENCH_APP_ID).delete()
+            db.session.commit()
+
+            with timed(results, mode, rows):
+                for start in range(0, rows, batch_limit):
+                    write_reviews(review_rows[start:start + batch_limit], bulk=bulk)
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=30000)
+    parser.add_argument("--batch-limit", type=int, default=1000)
+    parser.add_argument("--database-uri")
+    args = parser.parse_args()
+
+    print_results(run(args.rows, args.batch_limit, args.database_uri))
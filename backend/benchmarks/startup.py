@@ -0,0 +1,105 @@
+"""Cold start time of the web process, and what the pipeline warm-up costs.
+
+Run from backend/:
+    python -m benchmarks.startup --runs 5
+Each run is a fresh interpreter that imports flaskr, builds the app against a
+temp SQLite database (or BENCHMARK_DATABASE_URI / --database-uri) and serves
+its first request; the medians are reported along with any NLP/ML library
+that got imported on the way, which should be none. --warm-up also times
+warm_up_pipeline in the same interpreter. --max-startup SECONDS exits non-zero
+when import plus app creation is slower, so the check can run in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Libraries that only pipeline workers need; importing any at startup is a regression.
+HEAVY_MODULES = ("nltk", "sklearn", "scipy", "numpy", "joblib", "textblob", "langdetect", "vaderSentiment")
+
+def measure_cold_start(database_uri=None, warm_up: bool = False) -> dict:
+    """Measure this interpreter's startup; only meaningful as the first thing it does."""
+    start = time.perf_counter()
+    import flaskr
+    imported = time.perf_counter()
+
+    from .harness import benchmark_config
+    app = flaskr.create_app(benchmark_config(database_uri))
+    created = time.perf_counter()
+
+    app.test_client().get("/")
+    served = time.perf_counter()
+
+    result = {
+        "import_seconds": round(imported - start, 3),
+        "create_app_seconds": round(created - imported, 3),
+        "first_request_seconds": round(served - created, 3),
+        "heavy_modules": sorted(module for module in HEAVY_MODULES if module in sys.modules),
+    }
+    if warm_up:
+        from flaskr.services.warmup import warm_up_pipeline
+        with app.app_context():
+            result["warm_up_seconds"] = warm_up_pipeline()
+    return result
+
+def run(runs: int, database_uri=None, warm_up: bool = False) -> dict:
+    command = [sys.executable, "-m", "benchmarks.startup", "--child"]
+    if database_uri:
+        command += ["--database-uri", database_uri]
+    if warm_up:
+        command.append("--warm-up")
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            command, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    results = {
+        name: statistics.median(sample[name] for sample in samples)
+        for name in ("import_seconds", "create_app_seconds", "first_request_seconds")
+    }
+    results["startup_seconds"] = round(results["import_seconds"] + results["create_app_seconds"], 3)
+    results["heavy_modules"] = sorted({module for sample in samples for module in sample["heavy_modules"]})
+    if warm_up:
+        results["warm_up_seconds"] = {
+            step: statistics.median(sample["warm_up_seconds"].get(step, 0) for sample in samples)
+            for step in samples[0]["warm_up_seconds"]
+        }
+    return results
+
+def print_startup(results: dict, runs: int) -> None:
+    print(f"median of {runs} cold starts")
+    for name in ("import_seconds", "create_app_seconds", "startup_seconds", "first_request_seconds"):
+        print(f"  {name:<24} {results[name]:>8.3f}s")
+    print(f"  {'heavy modules loaded':<24} {', '.join(results['heavy_modules']) or 'none'}")
+    for step, seconds in results.get("warm_up_seconds", {}).items():
+        print(f"  warm-up {step:<16} {seconds:>8.3f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true", help="also time warm_up_pipeline")
+    parser.add_argument("--max-startup", type=float, help="fail if median import + create_app exceeds this")
+    parser.add_argument("--database-uri")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_cold_start(args.database_uri, args.warm_up)))
+        sys.exit(0)
+
+    results = run(args.runs, args.database_uri, args.warm_up)
+    print_startup(results, args.runs)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.max_startup is not None and results["startup_seconds"] > args.max_startup:
+        print(f"startup took {results['startup_seconds']:.3f}s, over the {args.max_startup:.3f}s budget")
+        sys.exit(1)
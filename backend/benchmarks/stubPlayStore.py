@@ -0,0 +1,29 @@
+from typing import Iterator, List, Optional
+from flaskr.services.reviewSources import ReviewSource
+from .syntheticReviews import generate_review_rows
+
+class StubPlayStore(ReviewSource):
+    """Stands in for Google Play, serving synthetic reviews newest first."""
+
+    name = "stub_play_store"
+
+    def __init__(self, app_id: str, count: int, foreign_ratio: float = 0.0,
+                 rating_weights: Optional[List[float]] = None, seed: int = 42):
+        self.app_id = app_id
+        self.rows = generate_review_rows(app_id, count, foreign_ratio, rating_weights, seed)
+
+    def app_details(self, app_id: str) -> dict:
+        return {"title": f"Benchmark {app_id}", "description": "Synthetic benchmark app"}
+
+    def iter_pages(self, app_id: str, page_size: int) -> Iterator[List[dict]]:
+        for offset in range(0, len(self.rows), page_size):
+            yield [
+                {
+                    "reviewId": f"{app_id}-{index}",
+                    "userName": row["name"],
+                    "content": row["content"],
+                    "score": row["rating"],
+                    "at": row["date"],
+                }
+                for index, row in enumerate(self.rows[offset:offset + page_size], start=offset)
+            ]
@@ -0,0 +1,56 @@
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+ENGLISH_PHRASES = [
+    "the app keeps crashing on login",
+    "great experience overall and very easy to use",
+    "too many ads, it is really annoying",
+    "latest update broke notifications",
+    "customer support never answered my ticket",
+    "love the new design and dark mode",
+    "battery drain is terrible since the update",
+    "works fine but sync is slow",
+    "cannot upload photos anymore",
+    "best app in its category, highly recommend",
+]
+
+FOREIGN_PHRASES = {
+    "es": ["la aplicación se cierra sola", "muy buena aplicación, me encanta"],
+    "fr": ["l'application plante tout le temps", "très bonne application, bravo"],
+    "de": ["die App stürzt ständig ab", "sehr gute App, gerne wieder"],
+}
+
+def random_content(rng: random.Random, foreign_ratio: float = 0.0) -> Tuple[str, str]:
+    """Return (language, content) for one synthetic review."""
+    if rng.random() < foreign_ratio:
+        language = rng.choice(list(FOREIGN_PHRASES))
+        return language, ". ".join(rng.choices(FOREIGN_PHRASES[language], k=rng.randint(1, 3)))
+    return "en", ". ".join(rng.choices(ENGLISH_PHRASES, k=rng.randint(1, 4)))
+
+def generate_labeled_texts(count: int, foreign_ratio: float = 0.3, seed: int = 42) -> List[Tuple[str, str]]:
+    """(language, content) pairs for measuring language detection."""
+    rng = random.Random(seed)
+    return [random_content(rng, foreign_ratio) for _ in range(count)]
+
+def generate_review_rows(app_id: str, count: int, foreign_ratio: float = 0.0,
+                         rating_weights: Optional[List[float]] = None, seed: int = 42) -> List[dict]:
+    """Build sanitized review rows shaped like sanitize_review_row output."""
+    return list(iter_review_rows(app_id, count, foreign_ratio, rating_weights, seed))
+
+def iter_review_rows(app_id: str, count: int, foreign_ratio: float = 0.0,
+                     rating_weights: Optional[List[float]] = None, seed: int = 42) -> Iterator[dict]:
+    rng = random.Random(seed)
+    rating_weights = rating_weights or [0.15, 0.1, 0.15, 0.25, 0.35]
+    newest = datetime(2025, 1, 1)
+
+    for index in range(count):
+        _, content = random_content(rng, foreign_ratio)
+
+        yield {
+            "app_id": app_id,
+            "name": f"user{index}",
+            "rating": rng.choices(range(1, 6), weights=rating_weights)[0],
+            "content": content,
+            "date": newest - timedelta(minutes=index * 7),
+        }
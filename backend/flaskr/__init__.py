@@ -1,4 +1,8 @@
-from flask import Flask
+import os
+import click
+from functools import wraps
+from flask import Flask, current_app
+from flask.helpers import get_debug_flag
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from .logger import get_logger
@@ -6,6 +10,100 @@ from .logger import get_logger
 db = SQLAlchemy()
 logger = get_logger(__name__)
 
+def requires_current_schema(command):
+    """Make a CLI command refuse to run while the database schema is out of date."""
+    @wraps(command)
+    def wrapper(*args, **kwargs):
+        error = current_app.extensions.get("schema_out_of_date")
+        if error:
+            raise click.ClickException(str(error))
+        return command(*args, **kwargs)
+    return wrapper
+
+def serving_with_flask_run() -> bool:
+    """Whether this process serves requests for `flask run` (not the reloader watching the code)."""
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or ctx.parent is None or ctx.info_name != "run":
+        return False
+    reload = ctx.params.get("reload")
+    if reload is None:
+        reload = get_debug_flag()
+    return not reload or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+
+def register_commands(app):
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Create missing tables and apply pending schema migrations."""
+        from .migrations import migrate_schema
+        applied = migrate_schema()
+        click.echo(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date")
+
+    @app.cli.command("import-reviews")
+    @requires_current_schema
+    @click.argument("app_id")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "file_format", type=click.Choice(["jsonl", "csv"]), help="Defaults to the file extension.")
+    @click.option("--name", help="App name, if the app does not exist yet.")
+    @click.option("--batch-size", default=5000, show_default=True)
+    def import_reviews_command(app_id, path, file_format, name, batch_size):
+        """Append the reviews in a JSON Lines or CSV file (optionally gzipped) to APP_ID.
+
+        Cached responses are only invalidated for the server with CACHE_BACKEND=redis;
+        the memory cache lives in the server process, which serves the old responses
+        until CACHE_TTL expires them or it restarts.
+        """
+        from .services.reviewExtraction import import_reviews
+        from .services.reviewSources import FileReviewSource
+        from .services.statsRollup import refresh_review_stats
+        from .cache import invalidate_app, get_cache, MemoryCacheBackend
+        source = FileReviewSource(path, file_format, title=name)
+        imported = import_reviews(app_id, source, batch_size=batch_size)
+        refresh_review_stats(app_id)
+        invalidate_app(app_id)
+        click.echo(f"Imported {imported} reviews ({source.skipped_count} unreadable records skipped)")
+        cache = get_cache()
+        if cache and isinstance(cache.backend, MemoryCacheBackend):
+            click.echo(f"Note: the server's memory cache keeps serving old responses for {app_id} for up to "
+                       f"{app.config.get('CACHE_TTL', 300)}s, or until it restarts; use CACHE_BACKEND=redis "
+                       f"to invalidate them from here.")
+
+    @app.cli.command("resume-jobs")
+    @requires_current_schema
+    @click.option("--stale-after", type=float, help="Seconds without a heartbeat. Defaults to JOB_RESUME_AFTER.")
+    def resume_jobs_command(stale_after):
+        """Resume processing jobs a dead process left behind, here, and wait for them to finish."""
+        from .routes.processing import process_app
+        pool = app.extensions["processing_worker_pool"]
+        resumed = pool.resume_interrupted(process_app, stale_after or app.config.get("JOB_RESUME_AFTER", 120))
+        if not resumed:
+            click.echo("No interrupted jobs")
+            return
+        click.echo(f"Resuming {len(resumed)} jobs: {', '.join(resumed)}")
+        pool.join()
+        for job_id in resumed:
+            events = pool.get(job_id)
+            click.echo(f"{job_id}: {events.events[-1].get('status')}")
+
+    @app.cli.command("warm-up")
+    def warm_up_command():
+        """Download missing NLTK data and load the pipeline's NLP/ML libraries, printing the time each took."""
+        from .services.warmup import warm_up_pipeline
+        for step, seconds in warm_up_pipeline().items():
+            click.echo(f"{step}: {seconds:.3f}s")
+
+    @app.cli.command("explain-endpoints")
+    @requires_current_schema
+    @click.argument("app_id")
+    def explain_endpoints_command(app_id):
+        """Print the query plan of every SELECT each customer endpoint runs for APP_ID."""
+        from .explain import explain_customer_endpoints
+        for url, statements in explain_customer_endpoints(app, app_id).items():
+            click.echo(f"\n=== {url}")
+            for statement in statements:
+                click.echo(statement["sql"])
+                for line in statement["plan"]:
+                    click.echo(f"    {line}")
+
 def create_app(config_class=None):
     app = Flask(__name__)
     
@@ -23,19 +121,44 @@ def create_app(config_class=None):
     
     from .routes.processing import processing_blueprint
     from .routes.customer import customer_blueprint
+    from .metrics import metrics_view
     
     app.register_blueprint(processing_blueprint, url_prefix="/processing")
     app.register_blueprint(customer_blueprint, url_prefix="/customer")
+
+    from .services.jobQueue import init_worker_pool
+    from .cache import init_cache
+    init_worker_pool(app)
+    init_cache(app)
     
+    from .migrations import migrate_schema, check_schema, SchemaOutOfDate
     with app.app_context():
+        if app.config.get("MIGRATE_ON_STARTUP", True):
+            migrate_schema()
         try:
-            db.create_all()
-            logger.info("Database tables created successfully")
-        except Exception as e:
-            logger.error(f"Error creating database tables: {e}")
+            check_schema()
+        except SchemaOutOfDate as e:
+            # The CLI loads the app before it knows which of the app's commands runs, so
+            # those still load and only refuse to run (requires_current_schema) unless they
+            # bring the schema up to date. Serving, `flask run` included, stops here.
+            ctx = click.get_current_context(silent=True)
+            if ctx is None or ctx.parent is not None:
+                raise
+            app.extensions["schema_out_of_date"] = e
+            logger.warning(str(e))
+
+    register_commands(app)
+
+    # `flask run` serves the app it loads here, so it starts the workers as wsgi.py does.
+    if serving_with_flask_run():
+        from .routes.processing import process_app
+        from .services.jobQueue import start_worker_pool
+        start_worker_pool(app, process_app)
     
     @app.route('/')
     def searchApp():
         return 'Hello this is Review Lens'
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
     
     return app
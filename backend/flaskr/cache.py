@@ -0,0 +1,177 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Optional
+from flask import current_app, request, make_response, Response
+from .logger import get_logger
+from .metrics import RESPONSE_CACHE_LOOKUPS
+
+logger = get_logger(__name__)
+
+# Namespace for responses that are not tied to a single app (e.g. the app listing).
+GLOBAL_NAMESPACE = "__all__"
+
+class MemoryCacheBackend:
+    """In-process LRU cache with a TTL on every entry."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace: str) -> int:
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+class RedisCacheBackend:
+    """Cache on a Redis-compatible server, shared by every web and worker process."""
+
+    def __init__(self, url: str, ttl: int):
+        import redis
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self._client.get(f"response:{key}")
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: dict) -> None:
+        self._client.set(f"response:{key}", json.dumps(value), ex=self.ttl)
+
+    def generation(self, namespace: str) -> int:
+        return int(self._client.get(f"generation:{namespace}") or 0)
+
+    def bump_generation(self, namespace: str) -> None:
+        self._client.incr(f"generation:{namespace}")
+
+class ResponseCache:
+    """Caches GET responses per endpoint and query args, namespaced by app.
+
+    Every key embeds its app's generation counter, so invalidating an app is a
+    single increment; stale entries are never read again and age out through
+    the backend's LRU/TTL eviction.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def make_key(self, namespace: str) -> str:
+        args = "&".join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+        generation = self.backend.generation(namespace)
+        return f"{namespace}:{generation}:{request.path}?{args}"
+
+    def invalidate_app(self, app_id: str) -> None:
+        self.backend.bump_generation(app_id)
+        self.backend.bump_generation(GLOBAL_NAMESPACE)
+        logger.info(f"Invalidated cached responses for app {app_id}")
+
+def init_cache(app) -> Optional[ResponseCache]:
+    """Set up the configured response cache, or none.
+
+    The in-process cache is only invalidated in the process that ran the job,
+    so with several web processes (WEB_CONCURRENCY) it would keep serving
+    stale responses elsewhere; it is then left off and only Redis is used.
+    """
+    backend_name = app.config.get("CACHE_BACKEND", "memory")
+    ttl = app.config.get("CACHE_TTL", 300)
+    web_processes = app.config.get("WEB_CONCURRENCY", 1)
+
+    backend = None
+    if backend_name == "redis":
+        try:
+            backend = RedisCacheBackend(app.config["CACHE_REDIS_URL"], ttl)
+        except Exception as e:
+            logger.error(f"Could not set up the Redis response cache: {str(e)}")
+    if backend is None and backend_name in ("memory", "redis"):
+        if web_processes > 1:
+            logger.warning(
+                f"Response cache disabled: an in-process cache would go stale across the {web_processes} "
+                f"web processes. Set CACHE_BACKEND=redis to share one between them."
+            )
+        else:
+            backend = MemoryCacheBackend(app.config.get("CACHE_MAX_ENTRIES", 1024), ttl)
+
+    cache = ResponseCache(backend) if backend else None
+    app.extensions["response_cache"] = cache
+    return cache
+
+def get_cache() -> Optional[ResponseCache]:
+    return current_app.extensions.get("response_cache")
+
+def invalidate_app(app_id: str) -> None:
+    cache = get_cache()
+    if cache:
+        try:
+            cache.invalidate_app(app_id)
+        except Exception as e:
+            logger.error(f"Error invalidating cached responses for app {app_id}: {str(e)}")
+
+def cached_response(view):
+    """Serve a GET view from the response cache, with ETag / 304 Not Modified support."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return view(*args, **kwargs)
+
+        namespace = request.args.get("appID") or GLOBAL_NAMESPACE
+        try:
+            key = cache.make_key(namespace)
+            cached = cache.backend.get(key)
+        except Exception as e:
+            logger.error(f"Response cache lookup failed: {str(e)}")
+            return view(*args, **kwargs)
+
+        RESPONSE_CACHE_LOOKUPS.labels(result="miss" if cached is None else "hit").inc()
+        if cached is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            body = response.get_data()
+            cached = {
+                "body": body.decode("utf-8"),
+                "mimetype": response.mimetype,
+                "etag": hashlib.sha1(body).hexdigest()
+            }
+            try:
+                cache.backend.set(key, cached)
+            except Exception as e:
+                logger.error(f"Response cache store failed: {str(e)}")
+
+        response = Response(cached["body"], status=200, mimetype=cached["mimetype"])
+        response.set_etag(cached["etag"])
+        # Let clients keep the body but revalidate it with If-None-Match every time.
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
+    return wrapper
@@ -5,6 +5,66 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
 
+    # Processing worker pool: number of concurrent pipeline runs and how many
+    # submitted jobs may wait for a free worker before /processing rejects more.
+    PROCESSING_WORKERS = int(os.environ.get("PROCESSING_WORKERS", 4))
+    PROCESSING_QUEUE_SIZE = int(os.environ.get("PROCESSING_QUEUE_SIZE", 100))
+
+    # Create tables and apply schema migrations when the app starts (under a
+    # Postgres advisory lock). With MIGRATE_ON_STARTUP=false run `flask migrate`
+    # on deploy instead; either way a server whose schema is not exactly this
+    # release's refuses to start.
+    MIGRATE_ON_STARTUP = os.environ.get("MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+    # Queued and running jobs are heartbeat every JOB_HEARTBEAT_SECONDS. When a
+    # server process starts (wsgi.py or `flask run`), jobs without a heartbeat
+    # for JOB_RESUME_AFTER seconds were left by a process that died and are
+    # resumed from their checkpoints (unless RESUME_INTERRUPTED_JOBS=false);
+    # `flask resume-jobs` does the same on demand.
+    JOB_HEARTBEAT_SECONDS = int(os.environ.get("JOB_HEARTBEAT_SECONDS", 30))
+    JOB_RESUME_AFTER = int(os.environ.get("JOB_RESUME_AFTER", 120))
+    RESUME_INTERRUPTED_JOBS = os.environ.get("RESUME_INTERRUPTED_JOBS", "true").lower() == "true"
+
+    # NLP/ML libraries load on first use so the web process starts fast. With
+    # WARM_UP_WORKERS they load in the background as soon as the processing
+    # workers start: on the first job, or when a server process starts
+    # (wsgi.py or `flask run`) with WARM_UP_ON_STARTUP.
+    WARM_UP_WORKERS = os.environ.get("WARM_UP_WORKERS", "true").lower() == "true"
+    WARM_UP_ON_STARTUP = os.environ.get("WARM_UP_ON_STARTUP", "false").lower() == "true"
+
+    # Storefront the Google Play review source scrapes.
+    GOOGLE_PLAY_LANG = os.environ.get("GOOGLE_PLAY_LANG", "en")
+    GOOGLE_PLAY_COUNTRY = os.environ.get("GOOGLE_PLAY_COUNTRY", "us")
+
+    # On an incremental refresh, topics are re-extracted only when the new reviews
+    # make up more than this share of the app's reviews; otherwise they are just linked.
+    TOPIC_REFRESH_RATIO = float(os.environ.get("TOPIC_REFRESH_RATIO", 0.2))
+
+    # Sentiment scorer ("textblob" or "vader") and scoring processes per job
+    # (defaults to the cores divided by PROCESSING_WORKERS).
+    SENTIMENT_SCORER = os.environ.get("SENTIMENT_SCORER", "textblob")
+    SENTIMENT_WORKERS = int(os.environ["SENTIMENT_WORKERS"]) if os.environ.get("SENTIMENT_WORKERS") else None
+
+    # Processes per job for the annotation pass and topic extraction
+    # preprocessing (defaults to the cores divided by PROCESSING_WORKERS).
+    PREPROCESSING_WORKERS = int(os.environ["PREPROCESSING_WORKERS"]) if os.environ.get("PREPROCESSING_WORKERS") else None
+
+    # Fitted topic models (vectorizer + LDA) per app; defaults to backend/model_registry.
+    MODEL_REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR")
+
+    # Customer response cache: "memory" (per process), "redis" or "none". The
+    # memory cache is turned off when WEB_CONCURRENCY (the gunicorn worker
+    # count, which gunicorn also reads) says there is more than one process.
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+    CACHE_TTL = int(os.environ.get("CACHE_TTL", 300))
+    CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+    # Review search off Postgres keeps an in-process index for this many apps,
+    # dropping the least recently searched one.
+    SEARCH_INDEX_MAX_APPS = int(os.environ.get("SEARCH_INDEX_MAX_APPS", 16))
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
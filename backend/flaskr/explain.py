@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from urllib.parse import quote
+from sqlalchemy import event
+from . import db
+from .models import Topic
+
+def customer_endpoint_urls(app_id: str) -> List[str]:
+    """One representative request per customer endpoint for the given app."""
+    topic = Topic.query.filter_by(app_id=app_id).first()
+    urls = [
+        f"/customer/reviews?appID={app_id}",
+        f"/customer/reviews?appID={app_id}&page=50",
+        f"/customer/reviews/rating?appID={app_id}&rating=5",
+        f"/customer/reviews/search?appID={app_id}&q=crash",
+        f"/customer/topics?appID={app_id}",
+        f"/customer/app?appID={app_id}",
+        f"/customer/apps",
+        f"/customer/sentiment/avg?appID={app_id}",
+        f"/customer/rating/avg?appID={app_id}",
+        f"/customer/reviews/rating-breakdown?appID={app_id}",
+        f"/customer/reviews/rating-trend?appID={app_id}&period=daily",
+    ]
+    if topic:
+        urls.append(f"/customer/reviews/topic?appID={app_id}&topic={quote(topic.content)}")
+    return urls
+
+@contextmanager
+def captured_selects(statements: List[Tuple[str, object]]):
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        yield
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+def explain_statement(statement: str, parameters) -> List[str]:
+    prefix = "EXPLAIN QUERY PLAN" if db.engine.dialect.name == "sqlite" else "EXPLAIN"
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"{prefix} {statement}", parameters).all()
+    return [" | ".join(str(value) for value in row) for row in rows]
+
+def explain_customer_endpoints(app, app_id: str) -> Dict[str, List[dict]]:
+    """Call every customer endpoint for app_id and return the plan of each SELECT it ran.
+
+    The response cache is bypassed so each endpoint reaches the database.
+    """
+    report = {}
+    cache = app.extensions.get("response_cache")
+    app.extensions["response_cache"] = None
+    try:
+        client = app.test_client()
+        with app.app_context():
+            urls = customer_endpoint_urls(app_id)
+            for url in urls:
+                statements = []
+                with captured_selects(statements):
+                    client.get(url)
+                report[url] = [
+                    {"sql": statement, "plan": explain_statement(statement, parameters)}
+                    for statement, parameters in statements
+                ]
+    finally:
+        app.extensions["response_cache"] = cache
+    return report
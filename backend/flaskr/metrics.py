@@ -0,0 +1,113 @@
+import os
+import time
+from contextlib import contextmanager
+from flask import Response, g, request
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+)
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Pipeline stages run from seconds to tens of minutes for large apps.
+STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "reviewlens_pipeline_stage_seconds",
+    "Duration of each processing pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+PIPELINE_STAGES = Counter(
+    "reviewlens_pipeline_stages_total",
+    "Pipeline stages run, by outcome (completed, skipped or failed)",
+    ["stage", "status"]
+)
+PIPELINE_REVIEWS = Counter(
+    "reviewlens_pipeline_reviews_total",
+    "Reviews written by each pipeline stage; rate() of this is the stage throughput",
+    ["stage"]
+)
+PROCESSING_JOBS = Counter(
+    "reviewlens_processing_jobs_total",
+    "Processing jobs finished, by final status",
+    ["status"]
+)
+PROCESSING_JOBS_REJECTED = Counter(
+    "reviewlens_processing_jobs_rejected_total",
+    "Processing jobs rejected because the queue was full"
+)
+PROCESSING_QUEUE_DEPTH = Gauge(
+    "reviewlens_processing_queue_depth",
+    "Processing jobs waiting for a worker",
+    multiprocess_mode="livesum"
+)
+PROCESSING_JOBS_RUNNING = Gauge(
+    "reviewlens_processing_jobs_running",
+    "Processing jobs currently running",
+    multiprocess_mode="livesum"
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "reviewlens_http_request_seconds",
+    "Latency of customer API requests",
+    ["endpoint", "method", "status"]
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "reviewlens_response_cache_lookups_total",
+    "Customer response cache lookups, by result (hit or miss)",
+    ["result"]
+)
+
+@contextmanager
+def observe_stage(stage: str):
+    """Time a pipeline stage and count its outcome.
+
+    Yields a dict whose "status" the caller may set to "skipped" or "failed";
+    an exception escaping the block counts as failed.
+    """
+    outcome = {"status": "completed"}
+    start = time.perf_counter()
+    try:
+        yield outcome
+    except Exception:
+        outcome["status"] = "failed"
+        raise
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+        PIPELINE_STAGES.labels(stage=stage, status=outcome["status"]).inc()
+
+def count_reviews(stage: str, count: int) -> None:
+    if count:
+        PIPELINE_REVIEWS.labels(stage=stage).inc(count)
+
+def start_request_timer() -> None:
+    g.metrics_request_start = time.perf_counter()
+
+def observe_request(response):
+    start = g.pop("metrics_request_start", None)
+    if start is not None:
+        HTTP_REQUEST_SECONDS.labels(
+            endpoint=request.endpoint or "unknown",
+            method=request.method,
+            status=response.status_code
+        ).observe(time.perf_counter() - start)
+    return response
+
+def instrument_blueprint(blueprint) -> None:
+    """Record the latency of every request the blueprint serves."""
+    blueprint.before_request(start_request_timer)
+    blueprint.after_request(observe_request)
+
+def metrics_registry():
+    # Under a multi-process server (e.g. gunicorn with several workers) each
+    # process writes its samples to PROMETHEUS_MULTIPROC_DIR and /metrics
+    # aggregates them; otherwise the default in-process registry is served.
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def metrics_view():
+    return Response(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
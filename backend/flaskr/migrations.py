@@ -0,0 +1,142 @@
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import inspect, insert, select, text
+from . import db
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Schema changes that db.create_all() cannot apply to tables that already exist.
+# Migrations run in order, once per database, and must be idempotent: on a new
+# database create_all has already built the current schema and they find
+# nothing to do.
+
+def add_review_preprocessing_columns(connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("review")}
+    if "language" not in columns:
+        connection.execute(text("ALTER TABLE review ADD COLUMN language VARCHAR(10)"))
+    if "cleaned_content" not in columns:
+        connection.execute(text("ALTER TABLE review ADD COLUMN cleaned_content TEXT"))
+
+def create_indexes(connection, table, names) -> None:
+    # Indexes are created by name: the models hold every index of the current
+    # schema, including ones over columns that a later migration adds.
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        indexes[name].create(connection, checkfirst=True)
+
+def add_review_access_indexes(connection) -> None:
+    from .models import Review, Topic
+    create_indexes(connection, Review.__table__, [
+        "ix_review_app_date",
+        "ix_review_app_rating_date",
+        "ix_review_app_topic_date",
+        "ix_review_app_id",
+    ])
+    create_indexes(connection, Topic.__table__, ["ix_topic_app_id"])
+
+def add_review_search_vector(connection) -> None:
+    # Postgres only: other databases search through the in-process index in
+    # services/reviewSearch.py. The generated column keeps itself in sync with
+    # content, so the bulk insert paths need no changes.
+    if connection.dialect.name != "postgresql":
+        return
+    columns = {column["name"] for column in inspect(connection).get_columns("review")}
+    if "search_vector" not in columns:
+        connection.execute(text(
+            "ALTER TABLE review ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED"
+        ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_review_search_vector ON review USING GIN (search_vector)"
+    ))
+
+def add_refresh_tracking_columns(connection) -> None:
+    # Apps scraped before this migration get no reviews_complete_through, so
+    # their next refresh is a full scrape, which also fills in source_review_id.
+    from .models import Review
+    review_columns = {column["name"] for column in inspect(connection).get_columns("review")}
+    if "source_review_id" not in review_columns:
+        connection.execute(text("ALTER TABLE review ADD COLUMN source_review_id VARCHAR(255)"))
+    app_columns = {column["name"] for column in inspect(connection).get_columns("application")}
+    if "reviews_complete_through" not in app_columns:
+        connection.execute(text("ALTER TABLE application ADD COLUMN reviews_complete_through TIMESTAMP"))
+    job_columns = {column["name"] for column in inspect(connection).get_columns("processing_job")}
+    if "full_refresh" not in job_columns:
+        connection.execute(text("ALTER TABLE processing_job ADD COLUMN full_refresh BOOLEAN NOT NULL DEFAULT FALSE"))
+    create_indexes(connection, Review.__table__, ["ux_review_app_source_review_id"])
+
+MIGRATIONS = [
+    ("0001_review_preprocessing_columns", add_review_preprocessing_columns),
+    ("0002_review_access_indexes", add_review_access_indexes),
+    ("0003_review_search_vector", add_review_search_vector),
+    ("0004_refresh_tracking_columns", add_refresh_tracking_columns),
+]
+
+# Key of the Postgres advisory lock held while the schema changes.
+SCHEMA_LOCK_KEY = 5_720_431
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+def run_migrations() -> list:
+    """Apply pending migrations and return the versions applied. Needs an app context."""
+    from .models import SchemaMigration
+
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    applied = set(db.session.execute(select(SchemaMigration.version)).scalars())
+    db.session.commit()
+
+    newly_applied = []
+    for version, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with db.engine.begin() as connection:
+            migrate(connection)
+            connection.execute(
+                insert(SchemaMigration.__table__).values(version=version, applied_at=datetime.utcnow())
+            )
+        logger.info(f"Applied schema migration {version}")
+        newly_applied.append(version)
+
+    return newly_applied
+
+@contextmanager
+def schema_lock():
+    """Hold a database-wide lock, so processes starting together change the schema one at a time.
+
+    Postgres only; SQLite has a single writer anyway.
+    """
+    if db.engine.dialect.name != "postgresql":
+        yield
+        return
+    with db.engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+def migrate_schema() -> list:
+    """Create missing tables and apply pending migrations under the schema lock. Needs an app context."""
+    with schema_lock():
+        db.create_all()
+        return run_migrations()
+
+def check_schema() -> None:
+    """Raise SchemaOutOfDate unless the database has exactly this code's migrations applied. Needs an app context."""
+    from .models import SchemaMigration
+
+    applied = set()
+    if inspect(db.engine).has_table(SchemaMigration.__tablename__):
+        applied = set(db.session.execute(select(SchemaMigration.version)).scalars())
+        db.session.commit()
+
+    known = [version for version, _ in MIGRATIONS]
+    pending = [version for version in known if version not in applied]
+    if pending:
+        raise SchemaOutOfDate(f"Database schema is missing migrations {', '.join(pending)}; run `flask migrate`")
+    unknown = sorted(applied.difference(known))
+    if unknown:
+        raise SchemaOutOfDate(f"Database schema has migrations this code does not know ({', '.join(unknown)}); "
+                              f"it belongs to a newer release")
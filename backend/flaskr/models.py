@@ -1,7 +1,8 @@
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, date
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Text, ForeignKey
+from sqlalchemy.orm.attributes import NO_VALUE, NEVER_SET
+from sqlalchemy import String, Text, ForeignKey, Date, Index, LargeBinary, event
 from . import db
 
 class App(db.Model):
@@ -10,20 +11,38 @@ class App(db.Model):
     id: Mapped[str] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100))
     description: Mapped[str] = mapped_column(Text)
+    # Newest review date up to which the stored reviews are known to be
+    # complete; None until a scrape has run to the end, so an interrupted
+    # first scrape is redone in full instead of refreshed incrementally.
+    reviews_complete_through: Mapped[Optional[datetime]] = mapped_column(nullable=True)
     
+    # Loaded only on access or when a query opts in (e.g. selectinload(App.reviews));
+    # deletes leave the rows to the database's ON DELETE CASCADE.
     reviews: Mapped[List["Review"]] = relationship(
         back_populates="app",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="select",
+        passive_deletes=True
     )
     topics: Mapped[List["Topic"]] = relationship(
         back_populates="app",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="select",
+        passive_deletes=True
     )
 
 class Review(db.Model):
     __tablename__ = "review"
+    __table_args__ = (
+        # Listings filter by app (and rating or topic) and page newest first on (date, id);
+        # pipeline stages walk an app's reviews in id order.
+        Index("ix_review_app_date", "app_id", "date", "id"),
+        Index("ix_review_app_rating_date", "app_id", "rating", "date", "id"),
+        Index("ix_review_app_topic_date", "app_id", "topic_id", "date", "id"),
+        Index("ix_review_app_id", "app_id", "id"),
+        # Refreshes match scraped reviews to stored ones by the source's review ID.
+        Index("ux_review_app_source_review_id", "app_id", "source_review_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     app_id: Mapped[str] = mapped_column(
@@ -33,23 +52,122 @@ class Review(db.Model):
     rating: Mapped[int]
     content: Mapped[str] = mapped_column(Text)
     date: Mapped[datetime]
+    # The review's ID at its source (Google Play's reviewId); None for reviews
+    # imported without one.
+    source_review_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     topic_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("topic.id", ondelete="SET NULL"),
         nullable=True
     )
     sentiment_score: Mapped[Optional[float]] = mapped_column(nullable=True)
+    # NLP preprocessing cached for topic extraction; NULL means not computed yet.
+    language: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
+    cleaned_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
     app: Mapped["App"] = relationship(back_populates="reviews")
     topic: Mapped[Optional["Topic"]] = relationship(back_populates="reviews")
 
+@event.listens_for(Review.content, "set", active_history=True)
+def reset_review_preprocessing(target, value, oldvalue, initiator):
+    """Cached preprocessing only holds for the content it was computed from."""
+    if oldvalue in (NO_VALUE, NEVER_SET) or value == oldvalue:
+        return
+    target.language = None
+    target.cleaned_content = None
+
 class Topic(db.Model):
     __tablename__ = "topic"
     
     id: Mapped[int] = mapped_column(primary_key=True)
     app_id: Mapped[str] = mapped_column(
-        ForeignKey("application.id", ondelete="CASCADE")
+        ForeignKey("application.id", ondelete="CASCADE"),
+        index=True
     )
     content: Mapped[str] = mapped_column(Text)
 
     app: Mapped["App"] = relationship(back_populates="topics")
-    reviews: Mapped[List["Review"]] = relationship(back_populates="topic")
\ No newline at end of file
+    reviews: Mapped[List["Review"]] = relationship(back_populates="topic")
+
+class ProcessingJob(db.Model):
+    __tablename__ = "processing_job"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    app_id: Mapped[str] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(20), default="queued")
+    stage: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    full_refresh: Mapped[bool] = mapped_column(default=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+class JobCheckpoint(db.Model):
+    """How far a processing job got, so a restarted job resumes instead of starting over."""
+    __tablename__ = "job_checkpoint"
+
+    job_id: Mapped[str] = mapped_column(
+        ForeignKey("processing_job.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    # Comma-separated stages that completed; a resumed job skips them.
+    completed_stages: Mapped[str] = mapped_column(Text, default="")
+    # Review extraction: source token of the page after the last committed one
+    # ("" once the source is exhausted), new reviews committed so far and, for
+    # an incremental refresh, the newest review date stored before it began.
+    continuation_token: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    committed_reviews: Mapped[int] = mapped_column(default=0)
+    refresh_since: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # Topic extraction: the partially fit vectorizer and LDA model, and the last
+    # review id and document count they were fit on.
+    lda_state: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    lda_last_review_id: Mapped[int] = mapped_column(default=0)
+    lda_documents: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+class StatsColumnsMixin:
+    """Review aggregates shared by the per-app and per-app-per-day rollups."""
+
+    review_count: Mapped[int] = mapped_column(default=0)
+    rating_sum: Mapped[int] = mapped_column(default=0)
+    rating_1_count: Mapped[int] = mapped_column(default=0)
+    rating_2_count: Mapped[int] = mapped_column(default=0)
+    rating_3_count: Mapped[int] = mapped_column(default=0)
+    rating_4_count: Mapped[int] = mapped_column(default=0)
+    rating_5_count: Mapped[int] = mapped_column(default=0)
+    sentiment_sum: Mapped[float] = mapped_column(default=0.0)
+    sentiment_count: Mapped[int] = mapped_column(default=0)
+
+class AppStats(StatsColumnsMixin, db.Model):
+    __tablename__ = "app_stats"
+
+    app_id: Mapped[str] = mapped_column(
+        ForeignKey("application.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+class AppDailyStats(StatsColumnsMixin, db.Model):
+    __tablename__ = "app_daily_stats"
+
+    app_id: Mapped[str] = mapped_column(
+        ForeignKey("application.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+class TopicStats(db.Model):
+    __tablename__ = "topic_stats"
+
+    topic_id: Mapped[int] = mapped_column(
+        ForeignKey("topic.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    app_id: Mapped[str] = mapped_column(
+        ForeignKey("application.id", ondelete="CASCADE")
+    )
+    review_count: Mapped[int] = mapped_column(default=0)
+
+class SchemaMigration(db.Model):
+    __tablename__ = "schema_migration"
+
+    version: Mapped[str] = mapped_column(String(100), primary_key=True)
+    applied_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
@@ -1,27 +1,99 @@
-from flask import Blueprint, request, jsonify
-from sqlalchemy import func
-from ..models import App, Review, Topic
+import base64
+import json
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from sqlalchemy import func, tuple_
+from ..models import App, Review, Topic, AppStats, AppDailyStats, TopicStats
 from .. import db
+from ..cache import cached_response
+from ..metrics import instrument_blueprint
+from ..services.reviewSearch import search_reviews, InvalidSearchCursor
+from ..services.reviewExport import iter_review_export, EXPORT_FORMATS
 
 customer_blueprint = Blueprint("customer", __name__)
+instrument_blueprint(customer_blueprint)
 
 @customer_blueprint.route("/", methods=["GET"])
 def hello():
     return "This is the customer route"
 
+# Largest page any listing serves; larger per_page values are capped to it.
+MAX_PER_PAGE = 500
+
+class InvalidCursor(ValueError):
+    pass
+
+class InvalidPageSize(ValueError):
+    pass
+
+def get_per_page(default: int) -> int:
+    """Read per_page from the query string, capped at MAX_PER_PAGE; values below 1 are rejected."""
+    per_page = request.args.get("per_page", default, type=int)
+    if per_page < 1:
+        raise InvalidPageSize("per_page must be at least 1")
+    return min(per_page, MAX_PER_PAGE)
+
+def encode_cursor(review) -> str:
+    payload = json.dumps([review.date.isoformat(), review.id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, review_id = json.loads(payload)
+        return datetime.fromisoformat(date), int(review_id)
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+def paginate_reviews(query):
+    """Page a Review query newest first and return (reviews, pagination fields for the response).
+
+    Without a page argument this is keyset pagination on (date, id): pass the
+    returned next_cursor back as cursor to get the following page, at the same
+    cost as the first one. page keeps the older OFFSET pagination. Both skip
+    the COUNT(*) when include_total=false.
+    """
+    per_page = get_per_page(10)
+    include_total = request.args.get("include_total", "true").lower() != "false"
+    query = query.order_by(Review.date.desc(), Review.id.desc())
+
+    if "page" in request.args:
+        page = request.args.get("page", 1, type=int)
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False, count=include_total)
+        reviews = pagination.items
+        fields = {
+            "current_page": pagination.page,
+            "next_cursor": encode_cursor(reviews[-1]) if len(reviews) == per_page else None
+        }
+        if include_total:
+            fields["total"] = pagination.total
+            fields["pages"] = pagination.pages
+    else:
+        page_query = query
+        cursor = request.args.get("cursor")
+        if cursor:
+            date, review_id = decode_cursor(cursor)
+            page_query = page_query.filter(tuple_(Review.date, Review.id) < tuple_(date, review_id))
+
+        reviews = page_query.limit(per_page + 1).all()
+        has_more = len(reviews) > per_page
+        reviews = reviews[:per_page]
+        fields = {"next_cursor": encode_cursor(reviews[-1]) if has_more else None}
+        if include_total:
+            fields["total"] = query.order_by(None).count()
+
+    return reviews, fields
+
 @customer_blueprint.route("/reviews", methods=["GET"])
+@cached_response
 def get_reviews():
     try:
         app_id = request.args.get("appID")
-        page = request.args.get("page", 1, type=int)
-        per_page = request.args.get("per_page", 10, type=int)
 
         if not app_id:
             return jsonify({"error": "AppID is required"}), 400
 
-        reviews = Review.query.filter_by(app_id=app_id)\
-            .order_by(Review.date.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        reviews, pagination = paginate_reviews(Review.query.filter_by(app_id=app_id))
 
         return jsonify({
             "reviews": [{
@@ -32,15 +104,16 @@ def get_reviews():
                 "date": review.date.isoformat(),
                 "sentiment_score": review.sentiment_score,
                 "topic_id": review.topic_id
-            } for review in reviews.items],
-            "total": reviews.total,
-            "pages": reviews.pages,
-            "current_page": reviews.page
+            } for review in reviews],
+            **pagination
         })
+    except (InvalidCursor, InvalidPageSize) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @customer_blueprint.route("/topics", methods=["GET"])
+@cached_response
 def get_topics():
     try:
         app_id = request.args.get("appID")
@@ -48,18 +121,23 @@ def get_topics():
         if not app_id:
             return jsonify({"error": "AppID is required"}), 400
 
-        topics = Topic.query.filter_by(app_id=app_id).all()
+        topics = db.session.query(Topic, TopicStats.review_count)\
+            .outerjoin(TopicStats, TopicStats.topic_id == Topic.id)\
+            .filter(Topic.app_id == app_id)\
+            .all()
 
         return jsonify({
             "topics": [{
                 "id": topic.id,
-                "content": topic.content
-            } for topic in topics]
+                "content": topic.content,
+                "review_count": review_count or 0
+            } for topic, review_count in topics]
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @customer_blueprint.route("/app", methods=["GET"])
+@cached_response
 def get_app():
     try:
         app_id = request.args.get("appID")
@@ -87,12 +165,11 @@ def get_app():
         return jsonify({"error": str(e)}), 500
 
 @customer_blueprint.route("/reviews/topic", methods=["GET"])
+@cached_response
 def get_reviews_by_topic():
     try:
         app_id = request.args.get("appID")
         topic_content = request.args.get("topic")
-        page = request.args.get("page", 1, type=int)
-        per_page = request.args.get("per_page", 10, type=int)
 
         if not app_id or not topic_content:
             return jsonify({"error": "Both AppID and topic content are required"}), 400
@@ -101,9 +178,7 @@ def get_reviews_by_topic():
         if not topic:
             return jsonify({"error": "Topic not found"}), 404
 
-        reviews = Review.query.filter_by(app_id=app_id, topic_id=topic.id)\
-            .order_by(Review.date.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        reviews, pagination = paginate_reviews(Review.query.filter_by(app_id=app_id, topic_id=topic.id))
 
         return jsonify({
             "reviews": [{
@@ -113,21 +188,20 @@ def get_reviews_by_topic():
                 "content": review.content,
                 "date": review.date.isoformat(),
                 "sentiment_score": review.sentiment_score
-            } for review in reviews.items],
-            "total": reviews.total,
-            "pages": reviews.pages,
-            "current_page": reviews.page
+            } for review in reviews],
+            **pagination
         })
+    except (InvalidCursor, InvalidPageSize) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @customer_blueprint.route("/reviews/rating", methods=["GET"])
+@cached_response
 def get_reviews_by_rating():
     try:
         app_id = request.args.get("appID")
         rating = request.args.get("rating", type=int)
-        page = request.args.get("page", 1, type=int)
-        per_page = request.args.get("per_page", 10, type=int)
 
         if not app_id or not rating:
             return jsonify({"error": "Both AppID and rating are required"}), 400
@@ -135,9 +209,7 @@ def get_reviews_by_rating():
         if not 1 <= rating <= 5:
             return jsonify({"error": "Rating must be between 1 and 5"}), 400
 
-        reviews = Review.query.filter_by(app_id=app_id, rating=rating)\
-            .order_by(Review.date.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        reviews, pagination = paginate_reviews(Review.query.filter_by(app_id=app_id, rating=rating))
 
         return jsonify({
             "reviews": [{
@@ -148,15 +220,90 @@ def get_reviews_by_rating():
                 "date": review.date.isoformat(),
                 "sentiment_score": review.sentiment_score,
                 "topic_id": review.topic_id
-            } for review in reviews.items],
-            "total": reviews.total,
-            "pages": reviews.pages,
-            "current_page": reviews.page
+            } for review in reviews],
+            **pagination
         })
+    except (InvalidCursor, InvalidPageSize) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@customer_blueprint.route("/reviews/search", methods=["GET"])
+@cached_response
+def search_app_reviews():
+    """Full-text search, best match first, with optional rating/topic_id/start_date/end_date filters."""
+    try:
+        app_id = request.args.get("appID")
+        text = request.args.get("q", "").strip()
+
+        if not app_id or not text:
+            return jsonify({"error": "Both AppID and q are required"}), 400
+
+        rating = request.args.get("rating", type=int)
+        if rating is not None and not 1 <= rating <= 5:
+            return jsonify({"error": "Rating must be between 1 and 5"}), 400
+
+        try:
+            start_date = parse_date_arg("start_date")
+            end_date = parse_date_arg("end_date")
+        except ValueError:
+            return jsonify({"error": "start_date and end_date must be formatted as YYYY-MM-DD"}), 400
+
+        results, next_cursor = search_reviews(
+            app_id,
+            text,
+            per_page=get_per_page(10),
+            cursor=request.args.get("cursor"),
+            rating=rating,
+            topic_id=request.args.get("topic_id", type=int),
+            start_date=start_date,
+            end_date=end_date + timedelta(days=1) if end_date else None
+        )
+
+        return jsonify({
+            "reviews": [{
+                "id": review.id,
+                "name": review.name,
+                "rating": review.rating,
+                "content": review.content,
+                "date": review.date.isoformat(),
+                "sentiment_score": review.sentiment_score,
+                "topic_id": review.topic_id,
+                "rank": rank
+            } for review, rank in results],
+            "next_cursor": next_cursor
+        })
+    except (InvalidSearchCursor, InvalidPageSize) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@customer_blueprint.route("/reviews/export", methods=["GET"])
+def export_reviews():
+    """Stream every review of the app with its annotations as NDJSON (default) or CSV."""
+    try:
+        app_id = request.args.get("appID")
+        export_format = request.args.get("format", "ndjson").lower()
+
+        if not app_id:
+            return jsonify({"error": "AppID is required"}), 400
+
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+        if not db.session.get(App, app_id):
+            return jsonify({"error": "App not found"}), 404
+
+        return Response(
+            stream_with_context(iter_review_export(app_id, export_format)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={"Content-Disposition": f"attachment; filename={app_id}-reviews.{export_format}"}
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @customer_blueprint.route("/sentiment/avg", methods=["GET"])
+@cached_response
 def get_avg_sentiment_score():
     try:
         app_id = request.args.get("appID")
@@ -164,9 +311,13 @@ def get_avg_sentiment_score():
         if not app_id:
             return jsonify({"error": "AppID is required"}), 400
 
-        avg_sentiment = db.session.query(func.avg(Review.sentiment_score))\
-            .filter_by(app_id=app_id)\
-            .scalar()
+        stats = db.session.get(AppStats, app_id)
+        if stats:
+            avg_sentiment = stats.sentiment_sum / stats.sentiment_count if stats.sentiment_count else None
+        else:
+            avg_sentiment = db.session.query(func.avg(Review.sentiment_score))\
+                .filter_by(app_id=app_id)\
+                .scalar()
 
         return jsonify({
             "app_id": app_id,
@@ -176,6 +327,7 @@ def get_avg_sentiment_score():
         return jsonify({"error": str(e)}), 500
 
 @customer_blueprint.route("/rating/avg", methods=["GET"])
+@cached_response
 def get_avg_rating():
     try:
         app_id = request.args.get("appID")
@@ -183,9 +335,13 @@ def get_avg_rating():
         if not app_id:
             return jsonify({"error": "AppID is required"}), 400
 
-        avg_rating = db.session.query(func.avg(Review.rating))\
-            .filter_by(app_id=app_id)\
-            .scalar()
+        stats = db.session.get(AppStats, app_id)
+        if stats:
+            avg_rating = stats.rating_sum / stats.review_count if stats.review_count else None
+        else:
+            avg_rating = db.session.query(func.avg(Review.rating))\
+                .filter_by(app_id=app_id)\
+                .scalar()
 
         return jsonify({
             "app_id": app_id,
@@ -195,21 +351,59 @@ def get_avg_rating():
         return jsonify({"error": str(e)}), 500
 
 @customer_blueprint.route("/apps", methods=["GET"])
+@cached_response
 def get_all_apps():
     try:
-        apps = App.query.all()
+        # Only the listing columns plus the rollup; no reviews or topics are loaded
+        query = db.session.query(
+            App.id,
+            App.name,
+            App.description,
+            AppStats.review_count,
+            AppStats.updated_at
+        ).outerjoin(AppStats, AppStats.app_id == App.id)\
+         .order_by(App.name, App.id)
+
+        # Paged only when asked for; the frontend loads the whole list in one request
+        if "page" in request.args or "per_page" in request.args:
+            page = request.args.get("page", 1, type=int)
+            per_page = get_per_page(100)
+            apps = query.paginate(page=page, per_page=per_page, error_out=False)
+            items, total, pages, current_page = apps.items, apps.total, apps.pages, apps.page
+        else:
+            items = query.all()
+            total, pages, current_page = len(items), 1, 1
+
+        # Apps processed before the rollup existed get a live count instead
+        missing_ids = [app.id for app in items if app.review_count is None]
+        live_counts = {}
+        if missing_ids:
+            live_counts = dict(
+                db.session.query(Review.app_id, func.count(Review.id))
+                .filter(Review.app_id.in_(missing_ids))
+                .group_by(Review.app_id)
+                .all()
+            )
 
         return jsonify({
             "apps": [{
                 "id": app.id,
                 "name": app.name,
-                "description": app.description
-            } for app in apps]
+                "description": app.description,
+                "review_count": app.review_count if app.review_count is not None else live_counts.get(app.id, 0),
+                "last_updated": app.updated_at.isoformat() if app.updated_at else None
+            } for app in items],
+            "total": total,
+            "pages": pages,
+            "current_page": current_page
         })
+    except InvalidPageSize as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @customer_blueprint.route("/reviews/rating-breakdown", methods=["GET"])
+@cached_response
 def get_rating_breakdown():
     try:
         app_id = request.args.get("appID")
@@ -217,14 +411,22 @@ def get_rating_breakdown():
         if not app_id:
             return jsonify({"error": "AppID is required"}), 400
 
-        # Query to get count of reviews for each rating
-        rating_counts = db.session.query(
-            Review.rating,
-            func.count(Review.id).label('count')
-        ).filter_by(app_id=app_id)\
-         .group_by(Review.rating)\
-         .order_by(Review.rating)\
-         .all()
+        stats = db.session.get(AppStats, app_id)
+        if stats:
+            rating_counts = [
+                (rating, getattr(stats, f"rating_{rating}_count"))
+                for rating in range(1, 6)
+                if getattr(stats, f"rating_{rating}_count")
+            ]
+        else:
+            # Query to get count of reviews for each rating
+            rating_counts = db.session.query(
+                Review.rating,
+                func.count(Review.id).label('count')
+            ).filter_by(app_id=app_id)\
+             .group_by(Review.rating)\
+             .order_by(Review.rating)\
+             .all()
 
         # Format the response as requested
         breakdown = [
@@ -239,7 +441,40 @@ def get_rating_breakdown():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+TREND_PERIOD_UNITS = {"daily": "day", "weekly": "week", "monthly": "month"}
+
+def parse_date_arg(name):
+    """Parse an optional YYYY-MM-DD query argument; raises ValueError if malformed."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d")
+
+def rating_trend_bucket(period):
+    """SQL expression bucketing Review.date for the period.
+
+    Postgres truncates to the exact period. Elsewhere reviews are grouped by
+    day (by month for monthly) and ISO weeks are merged in Python.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return func.date_trunc(TREND_PERIOD_UNITS[period], Review.date)
+    if dialect == "sqlite" and period == "monthly":
+        return func.strftime("%Y-%m-01", Review.date)
+    return func.date(Review.date)
+
+def format_trend_key(bucket, period):
+    if isinstance(bucket, str):
+        bucket = datetime.fromisoformat(bucket)
+    if period == "weekly":
+        year, week, _ = bucket.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "monthly":
+        return bucket.strftime('%Y-%m')
+    return bucket.strftime('%Y-%m-%d')
+
 @customer_blueprint.route("/reviews/rating-trend", methods=["GET"])
+@cached_response
 def get_rating_trend():
     try:
         app_id = request.args.get("appID")
@@ -247,80 +482,56 @@ def get_rating_trend():
         
         if not app_id:
             return jsonify({"error": "AppID is required"}), 400
+
+        try:
+            start_date = parse_date_arg("start_date")
+            end_date = parse_date_arg("end_date")
+        except ValueError:
+            return jsonify({"error": "start_date and end_date must be formatted as YYYY-MM-DD"}), 400
         
-        # Query reviews with date and rating
-        reviews = Review.query.filter_by(app_id=app_id)\
-            .order_by(Review.date.asc())\
-            .all()
-        
-        if not reviews:
-            return jsonify({
-                "app_id": app_id,
-                "period": period,
-                "trend_data": [],
-                "trend_statistics": {
-                    "change": "0.00",
-                    "percentageChange": "0.0",
-                    "direction": "stable"
-                }
-            })
-        
-        # Group by time period and calculate averages
+        # Group by time period in the database, returning one row per bucket
         trend_data = []
         
-        if period == "daily":
-            # Group by day
-            daily_groups = {}
-            for review in reviews:
-                date_key = review.date.strftime('%Y-%m-%d')
-                if date_key not in daily_groups:
-                    daily_groups[date_key] = []
-                daily_groups[date_key].append(review.rating)
-            
-            # Calculate daily averages
-            for date, ratings in sorted(daily_groups.items()):
-                avg_rating = sum(ratings) / len(ratings)
-                trend_data.append({
-                    "date": date,
-                    "avg_rating": round(avg_rating, 2),
-                    "review_count": len(ratings)
-                })
-        
-        elif period == "weekly":
-            # Group by week
-            weekly_groups = {}
-            for review in reviews:
-                year, week, _ = review.date.isocalendar()
-                date_key = f"{year}-W{week:02d}"
-                if date_key not in weekly_groups:
-                    weekly_groups[date_key] = []
-                weekly_groups[date_key].append(review.rating)
-            
-            # Calculate weekly averages
-            for date, ratings in sorted(weekly_groups.items()):
-                avg_rating = sum(ratings) / len(ratings)
-                trend_data.append({
-                    "date": date,
-                    "avg_rating": round(avg_rating, 2),
-                    "review_count": len(ratings)
-                })
-        
-        elif period == "monthly":
-            # Group by month
-            monthly_groups = {}
-            for review in reviews:
-                date_key = review.date.strftime('%Y-%m')
-                if date_key not in monthly_groups:
-                    monthly_groups[date_key] = []
-                monthly_groups[date_key].append(review.rating)
+        if period in TREND_PERIOD_UNITS:
+            if db.session.get(AppStats, app_id):
+                # The daily rollup already holds one row per day
+                query = db.session.query(
+                    AppDailyStats.day,
+                    AppDailyStats.rating_sum,
+                    AppDailyStats.review_count
+                ).filter(AppDailyStats.app_id == app_id)
+
+                if start_date:
+                    query = query.filter(AppDailyStats.day >= start_date.date())
+                if end_date:
+                    query = query.filter(AppDailyStats.day <= end_date.date())
+            else:
+                bucket = rating_trend_bucket(period).label("bucket")
+                query = db.session.query(
+                    bucket,
+                    func.sum(Review.rating).label("rating_sum"),
+                    func.count(Review.id).label("review_count")
+                ).filter(Review.app_id == app_id)
+
+                if start_date:
+                    query = query.filter(Review.date >= start_date)
+                if end_date:
+                    query = query.filter(Review.date < end_date + timedelta(days=1))
+                query = query.group_by(bucket)
+
+            groups = {}
+            for bucket_value, rating_sum, review_count in query.all():
+                date_key = format_trend_key(bucket_value, period)
+                totals = groups.setdefault(date_key, [0, 0])
+                totals[0] += rating_sum
+                totals[1] += review_count
             
-            # Calculate monthly averages
-            for date, ratings in sorted(monthly_groups.items()):
-                avg_rating = sum(ratings) / len(ratings)
+            # Calculate per-period averages
+            for date, (rating_sum, review_count) in sorted(groups.items()):
                 trend_data.append({
                     "date": date,
-                    "avg_rating": round(avg_rating, 2),
-                    "review_count": len(ratings)
+                    "avg_rating": round(rating_sum / review_count, 2),
+                    "review_count": review_count
                 })
         
         # Calculate trend statistics
@@ -1,99 +1,225 @@
 import threading
 from flask import Blueprint, request, jsonify, current_app, Response
-from .. import create_app
 import json
 import queue
 import time
 
+from .. import db
+from ..models import ProcessingJob, Review, Topic
 from ..services.googlePlayStore import validate_ID
 from ..services.reviewExtraction import extract_reviews
-from ..services.topicExtraction import extract_topics
 from ..services.reviewTopicLinkage import link_topics_reviews
-from ..services.sentimentAnalysis import analyze_sentiment
+from ..services.reviewAnnotation import annotate_reviews
+from ..services.stageGraph import StageGraph
+from ..services.jobCheckpoint import JobCheckpointer
+from ..services.statsRollup import refresh_review_stats, refresh_topic_stats
+from ..services.jobQueue import get_worker_pool, JobQueueFull, JobAlreadyActive
+from ..cache import invalidate_app
 
 processing_blueprint = Blueprint("api", __name__)
 
+def topics_need_refresh(app_id: str, new_reviews: int) -> bool:
+    """Topics survive an incremental refresh; re-extract them only if the delta is large."""
+    if not Topic.query.filter_by(app_id=app_id).first():
+        return True
+
+    total_reviews = Review.query.filter_by(app_id=app_id).count()
+    if total_reviews == 0:
+        return False
+    return new_reviews / total_reviews > current_app.config.get("TOPIC_REFRESH_RATIO", 0.2)
+
 def process_app(app_id: str, status_queue: queue.Queue):
-    """Process the app through all stages and update status through queue."""
-    app = create_app()
-    with app.app_context():
-        try:
-            status_queue.put({"stage": "validation", "status": "started"})
+    """Process the app through all stages and update status through queue.
+
+    Stages run as a dependency graph. Sentiment analysis is the single
+    annotation pass: it scores, detects the language of and cleans reviews as
+    extraction commits them, and fits the topic model on the way when the app
+    has no topics. Topic extraction then only refits an existing model that a
+    large refresh made stale. Each stage still reports its own
+    started/completed/failed events.
+
+    Jobs from the worker pool are checkpointed as they go; a resumed job skips
+    the stages it completed and continues the others where they stopped. A
+    job submitted with full_refresh scrapes the app from scratch instead of
+    refreshing it incrementally.
+    """
+    try:
+        job_id = getattr(status_queue, "job_id", None)
+        checkpoint = JobCheckpointer(job_id) if job_id else None
+        full_refresh = bool(job_id) and db.session.get(ProcessingJob, job_id).full_refresh
+        completed = checkpoint.load() if checkpoint else set()
+        graph = StageGraph(
+            current_app._get_current_object(),
+            status_queue,
+            on_completed=checkpoint.mark_completed if checkpoint else None
+        )
+
+        def validate(graph):
             if not validate_ID(app_id):
-                status_queue.put({"stage": "validation", "status": "failed", "error": "Invalid App ID"})
-                return
-            status_queue.put({"stage": "validation", "status": "completed"})
-
-            status_queue.put({"stage": "review_extraction", "status": "started"})
-            try:
-                extract_reviews(app_id)
-                status_queue.put({"stage": "review_extraction", "status": "completed"})
-            except Exception as e:
-                status_queue.put({"stage": "review_extraction", "status": "failed", "error": str(e)})
-                return
-
-            status_queue.put({"stage": "sentiment_analysis", "status": "started"})
-            try:
-                analyze_sentiment(app_id)
-                status_queue.put({"stage": "sentiment_analysis", "status": "completed"})
-            except Exception as e:
-                status_queue.put({"stage": "sentiment_analysis", "status": "failed", "error": str(e)})
-                return
-
-            status_queue.put({"stage": "topic_extraction", "status": "started"})
-            try:
-                extract_topics(app_id)
-                status_queue.put({"stage": "topic_extraction", "status": "completed"})
-            except Exception as e:
-                status_queue.put({"stage": "topic_extraction", "status": "failed", "error": str(e)})
-                return
-
-            status_queue.put({"stage": "topic_linkage", "status": "started"})
-            try:
-                link_topics_reviews(app_id)
-                status_queue.put({"stage": "topic_linkage", "status": "completed"})
-            except Exception as e:
-                status_queue.put({"stage": "topic_linkage", "status": "failed", "error": str(e)})
-                return
-
+                raise ValueError("Invalid App ID")
+
+        def extract(graph):
+            new_reviews = extract_reviews(
+                app_id,
+                incremental=not full_refresh,
+                on_batch_committed=lambda: graph.notify_progress("review_extraction"),
+                checkpoint=checkpoint
+            )
+            invalidate_app(app_id)
+            return {"new_reviews": new_reviews}
+
+        def annotate(graph):
+            # The stage starts once extraction has the app record in place, so
+            # a full scrape has already dropped the old topics.
+            fit_topics = not Topic.query.filter_by(app_id=app_id).first()
+            annotate_reviews(
+                app_id,
+                fit_topics=fit_topics,
+                checkpoint=checkpoint,
+                source_finished=graph.finished("review_extraction"),
+                source_progress=graph.progress("review_extraction"),
+                source_error=lambda: graph.error("review_extraction")
+            )
+            # Only this stage rebuilds review stats: it is the last to touch them.
+            refresh_review_stats(app_id)
+            invalidate_app(app_id)
+            return {"fit_topics": fit_topics}
+
+        def extract_topics(graph):
+            if graph.result("sentiment_analysis").get("fit_topics"):
+                return {}
+            if not topics_need_refresh(app_id, graph.result("review_extraction")["new_reviews"]):
+                return {"skipped": True}
+            annotate_reviews(app_id, fit_topics=True, score_sentiment=False, checkpoint=checkpoint)
+            invalidate_app(app_id)
+
+        def link_topics(graph):
+            link_topics_reviews(app_id)
+            refresh_topic_stats(app_id)
+            invalidate_app(app_id)
+
+        graph.add("validation", validate)
+        graph.add("review_extraction", extract, after=("validation",))
+        graph.add("sentiment_analysis", annotate, after=("validation",), streams_from="review_extraction")
+        graph.add("topic_extraction", extract_topics, after=("review_extraction", "sentiment_analysis"))
+        graph.add("topic_linkage", link_topics, after=("topic_extraction",))
+
+        for stage in graph.stages:
+            if stage in completed:
+                result = {}
+                if stage == "review_extraction":
+                    progress = checkpoint.extraction_progress()
+                    result["new_reviews"] = progress.committed_reviews if progress else 0
+                elif stage == "sentiment_analysis":
+                    # Topics saved alongside a fit checkpoint came from the annotation pass.
+                    result["fit_topics"] = checkpoint.has_topic_model() \
+                        and Topic.query.filter_by(app_id=app_id).first() is not None
+                graph.skip(stage, result)
+
+        if graph.run():
+            if checkpoint:
+                checkpoint.finish()
             status_queue.put({"stage": "all", "status": "completed"})
 
-        except Exception as e:
-            status_queue.put({"stage": "all", "status": "failed", "error": str(e)})
+    except Exception as e:
+        status_queue.put({"stage": "all", "status": "failed", "error": str(e)})
+
+def stream_job_events(events):
+    """Yield a job's status events as SSE messages, with heartbeats while it is idle."""
+    cursor = 0
+    while True:
+        new_events = events.wait(cursor, timeout=1)
+        if not new_events:
+            yield f"data: {json.dumps({'status': 'heartbeat'})}\n\n"
+            continue
+
+        for status in new_events:
+            yield f"data: {json.dumps(status)}\n\n"
+        cursor += len(new_events)
+
+        if new_events[-1]["stage"] == "all":
+            break
 
 @processing_blueprint.route("/process", methods=["POST"])
 def process_app_endpoint():
     """Endpoint to process an app through all stages with live status updates."""
     data = request.get_json()
     app_id = data.get("appID")
+    full_refresh = bool(data.get("full_refresh", False))
 
     if not app_id:
         return jsonify({"error": "Input is missing AppID."}), 400
 
-    status_queue = queue.Queue()
+    try:
+        events = get_worker_pool().submit(app_id, process_app, full_refresh=full_refresh)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    except JobAlreadyActive as e:
+        return jsonify({"error": str(e), "job_id": e.job_id}), 409
 
-    def generate():
-        app = create_app()
-        with app.app_context():
-            thread = threading.Thread(target=process_app, args=(app_id, status_queue))
-            thread.daemon = True
-            thread.start()
-
-            while True:
-                try:
-                    status = status_queue.get(timeout=1)
-                
-                    if status["stage"] == "all":
-                        yield f"data: {json.dumps(status)}\n\n"
-                        break
-                        
-                    yield f"data: {json.dumps(status)}\n\n"
-                    
-                except queue.Empty:
-                    yield f"data: {json.dumps({'status': 'heartbeat'})}\n\n"
-                    continue
-
-    return Response(generate(), mimetype='text/event-stream')
+    response = Response(stream_job_events(events), mimetype='text/event-stream')
+    response.headers["X-Job-ID"] = events.job_id
+    return response
+
+@processing_blueprint.route("/jobs", methods=["POST"])
+def submit_job():
+    """Queue an app for processing and return its job ID without waiting."""
+    data = request.get_json()
+    app_id = data.get("appID")
+    full_refresh = bool(data.get("full_refresh", False))
+
+    if not app_id:
+        return jsonify({"error": "Input is missing AppID."}), 400
+
+    try:
+        events = get_worker_pool().submit(app_id, process_app, full_refresh=full_refresh)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    except JobAlreadyActive as e:
+        return jsonify({"error": str(e), "job_id": e.job_id}), 409
+
+    return jsonify({"job_id": events.job_id, "app_id": app_id, "status": "queued"}), 202
+
+@processing_blueprint.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = db.session.get(ProcessingJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify({
+        "job_id": job.id,
+        "app_id": job.app_id,
+        "status": job.status,
+        "stage": job.stage,
+        "error": job.error,
+        "full_refresh": job.full_refresh,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat()
+    })
+
+@processing_blueprint.route("/jobs/<job_id>/resume", methods=["POST"])
+def resume_job(job_id):
+    """Queue a failed job again; it continues from its last checkpoint."""
+    job = db.session.get(ProcessingJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    try:
+        events = get_worker_pool().resume(job_id, process_app)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    if not events:
+        return jsonify({"error": f"Only failed jobs can be resumed; job is {job.status}"}), 409
+
+    return jsonify({"job_id": job_id, "app_id": job.app_id, "status": "queued"}), 202
+
+@processing_blueprint.route("/jobs/<job_id>/events", methods=["GET"])
+def get_job_events(job_id):
+    events = get_worker_pool().get(job_id)
+    if not events:
+        return jsonify({"error": "Job not found or no longer tracked"}), 404
+
+    return Response(stream_job_events(events), mimetype='text/event-stream')
 
 @processing_blueprint.route("/test/reviewExtraction", methods=["POST"])
 def test_review_extraction():
@@ -103,10 +229,13 @@ def test_review_extraction():
     if not appID:
         return jsonify({"Error": "Input is missing AppID."}), 400
 
+    app = current_app._get_current_object()
+
     def extract_reviews_contexted(appID):
-        app = create_app()
         with app.app_context():
             extract_reviews(appID)
+            refresh_review_stats(appID)
+            invalidate_app(appID)
 
     thread = threading.Thread(target=extract_reviews_contexted, args=(appID,))
     thread.daemon = True
@@ -126,11 +255,14 @@ def test_sentiment_analysis():
     if not appID:
         return jsonify({"Error": "Input is missing AppID."}), 400
 
+    app = current_app._get_current_object()
+
     def analyze_sentiment_contexted(appID):
-        app = create_app()
         with app.app_context():
             from ..services.sentimentAnalysis import analyze_sentiment
             analyze_sentiment(appID)
+            refresh_review_stats(appID)
+            invalidate_app(appID)
 
     thread = threading.Thread(target=analyze_sentiment_contexted, args=(appID,))
     thread.daemon = True
@@ -146,11 +278,13 @@ def test_topic_extraction():
     if not appID:
         return jsonify({"Error": "Input is missing AppID."}), 400
 
+    app = current_app._get_current_object()
+
     def extract_topics_contexted(appID):
-        app = create_app()
         with app.app_context():
             from ..services.topicExtraction import extract_topics
             extract_topics(appID)
+            invalidate_app(appID)
 
     thread = threading.Thread(target=extract_topics_contexted, args=(appID,))
     thread.daemon = True
@@ -166,11 +300,14 @@ def test_review_topic_linkage():
     if not appID:
         return jsonify({"Error": "Input is missing AppID."}), 400
 
+    app = current_app._get_current_object()
+
     def link_topics_contexted(appID):
-        app = create_app()
         with app.app_context():
             from ..services.reviewTopicLinkage import link_topics_reviews
             link_topics_reviews(appID)
+            refresh_topic_stats(appID)
+            invalidate_app(appID)
 
     thread = threading.Thread(target=link_topics_contexted, args=(appID,))
     thread.daemon = True
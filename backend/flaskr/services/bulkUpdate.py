@@ -0,0 +1,36 @@
+from typing import List
+from sqlalchemy import update, values, column, cast, bindparam
+from ..models import Review
+from .. import db
+
+def bulk_update_reviews(rows: List[dict]) -> None:
+    """Update review rows by id in one statement. Each row holds "id" plus the columns to set.
+
+    On Postgres this is a single UPDATE ... FROM (VALUES ...); other databases
+    get an executemany UPDATE keyed on the primary key. The caller commits.
+    """
+    if not rows:
+        return
+
+    table = Review.__table__
+    columns = [name for name in rows[0] if name != "id"]
+
+    if db.session.get_bind().dialect.name == "postgresql":
+        updates = values(
+            column("id", table.c.id.type),
+            *[column(name, table.c[name].type) for name in columns],
+            name="updates"
+        ).data([tuple(row[name] for name in ["id", *columns]) for row in rows])
+
+        db.session.execute(
+            update(table)
+            .where(table.c.id == updates.c.id)
+            .values({name: cast(updates.c[name], table.c[name].type) for name in columns})
+        )
+    else:
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("review_id"))
+            .values({name: bindparam(name) for name in columns}),
+            [{"review_id": row["id"], **{name: row[name] for name in columns}} for row in rows]
+        )
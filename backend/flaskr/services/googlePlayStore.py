@@ -1,10 +1,17 @@
-from google_play_scraper import app
-from google_play_scraper.exceptions import NotFoundError
+from flask import current_app
 from .. import logger
 
 def validate_ID(app_id: str) -> bool:
+    from google_play_scraper import app
+    from google_play_scraper.exceptions import NotFoundError
+
     try:
-        app(app_id, lang='en', country='us')
+        # Same store front as GooglePlaySource, so an app that validates can be scraped.
+        app(
+            app_id,
+            lang=current_app.config.get("GOOGLE_PLAY_LANG", "en"),
+            country=current_app.config.get("GOOGLE_PLAY_COUNTRY", "us")
+        )
         logger.info(f"App ID {app_id} is valid")
         return True
     except NotFoundError:
@@ -12,4 +19,4 @@ def validate_ID(app_id: str) -> bool:
         return False
     except Exception as e:
         logger.error(f"Error validating app ID {app_id}: {str(e)}")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,136 @@
+from __future__ import annotations
+import io
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, Set
+from sqlalchemy import delete, insert, select, update
+from .. import db
+from ..models import JobCheckpoint
+from ..logger import get_logger
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.decomposition import LatentDirichletAllocation
+
+logger = get_logger(__name__)
+
+@dataclass
+class ExtractionProgress:
+    continuation_token: str
+    committed_reviews: int
+    refresh_since: Optional[datetime]
+
+@dataclass
+class TopicModelProgress:
+    vectorizer: CountVectorizer
+    lda_model: LatentDirichletAllocation
+    last_review_id: int
+    documents: int
+
+class JobCheckpointer:
+    """Reads and saves one processing job's checkpoint.
+
+    Stage completions are written on their own connection, since stages run in
+    separate threads. Extraction and topic model progress are added to the
+    caller's session instead, so they commit together with the batch they
+    describe and a resumed job never repeats or skips a committed batch.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._completed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def load(self) -> Set[str]:
+        """Create the job's checkpoint if it has none yet and return the stages it already completed."""
+        with db.engine.begin() as connection:
+            completed = connection.execute(
+                select(JobCheckpoint.completed_stages).where(JobCheckpoint.job_id == self.job_id)
+            ).scalar_one_or_none()
+            if completed is None:
+                connection.execute(insert(JobCheckpoint.__table__).values(job_id=self.job_id))
+        with self._lock:
+            self._completed = {stage for stage in (completed or "").split(",") if stage}
+            return set(self._completed)
+
+    def mark_completed(self, stage: str) -> None:
+        with self._lock:
+            self._completed.add(stage)
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(JobCheckpoint.__table__)
+                    .where(JobCheckpoint.job_id == self.job_id)
+                    .values(completed_stages=",".join(sorted(self._completed)), updated_at=datetime.utcnow())
+                )
+
+    def finish(self) -> None:
+        """Drop the checkpoint of a job that completed; there is nothing left to resume."""
+        with db.engine.begin() as connection:
+            connection.execute(delete(JobCheckpoint.__table__).where(JobCheckpoint.job_id == self.job_id))
+
+    def extraction_progress(self) -> Optional[ExtractionProgress]:
+        """Return where extraction stopped, or None if it has not committed a batch yet."""
+        row = db.session.execute(
+            select(JobCheckpoint.continuation_token, JobCheckpoint.committed_reviews, JobCheckpoint.refresh_since)
+            .where(JobCheckpoint.job_id == self.job_id)
+        ).one_or_none()
+        if row is None or row.continuation_token is None:
+            return None
+        return ExtractionProgress(row.continuation_token, row.committed_reviews, row.refresh_since)
+
+    def save_extraction(self, continuation_token: str, committed_reviews: int,
+                        refresh_since: Optional[datetime]) -> None:
+        """Add extraction progress to the current transaction; the caller commits it with the batch."""
+        db.session.execute(
+            update(JobCheckpoint.__table__)
+            .where(JobCheckpoint.job_id == self.job_id)
+            .values(
+                continuation_token=continuation_token,
+                committed_reviews=committed_reviews,
+                refresh_since=refresh_since,
+                updated_at=datetime.utcnow()
+            )
+        )
+
+    def topic_model_progress(self) -> Optional[TopicModelProgress]:
+        """Return the partially fit topic model, or None if topic extraction has not saved one."""
+        row = db.session.execute(
+            select(JobCheckpoint.lda_state, JobCheckpoint.lda_last_review_id, JobCheckpoint.lda_documents)
+            .where(JobCheckpoint.job_id == self.job_id)
+        ).one_or_none()
+        if row is None or row.lda_state is None:
+            return None
+        import joblib
+        try:
+            state = joblib.load(io.BytesIO(row.lda_state))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable topic model checkpoint of job {self.job_id}: {str(e)}")
+            return None
+        return TopicModelProgress(state["vectorizer"], state["lda_model"], row.lda_last_review_id, row.lda_documents)
+
+    def has_topic_model(self) -> bool:
+        return db.session.execute(
+            select(JobCheckpoint.lda_state.is_not(None)).where(JobCheckpoint.job_id == self.job_id)
+        ).scalar_one_or_none() is True
+
+    def save_topic_model(self, vectorizer: CountVectorizer, lda_model: LatentDirichletAllocation,
+                         last_review_id: int, documents: int) -> None:
+        """Add the partially fit model to the current transaction; the caller commits it with the batch."""
+        import joblib
+        # stop_words_ only records the terms the vectorizer dropped and can be
+        # far larger than the model; scikit-learn documents it as safe to drop.
+        if getattr(vectorizer, "stop_words_", None) is not None:
+            vectorizer.stop_words_ = None
+        buffer = io.BytesIO()
+        joblib.dump({"vectorizer": vectorizer, "lda_model": lda_model}, buffer, compress=3)
+        db.session.execute(
+            update(JobCheckpoint.__table__)
+            .where(JobCheckpoint.job_id == self.job_id)
+            .values(
+                lda_state=buffer.getvalue(),
+                lda_last_review_id=last_review_id,
+                lda_documents=documents,
+                updated_at=datetime.utcnow()
+            )
+        )
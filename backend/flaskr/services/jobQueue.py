@@ -0,0 +1,344 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+from flask import current_app
+from sqlalchemy import select, update
+from .. import db
+from ..models import ProcessingJob
+from ..logger import get_logger
+from ..metrics import PROCESSING_JOBS, PROCESSING_JOBS_REJECTED, PROCESSING_JOBS_RUNNING, PROCESSING_QUEUE_DEPTH
+
+logger = get_logger(__name__)
+
+# Finished jobs whose status events are kept in memory for late SSE subscribers.
+JOB_HISTORY_SIZE = 200
+
+class JobQueueFull(Exception):
+    pass
+
+class JobAlreadyActive(Exception):
+    """Another process is already working on a job for the app."""
+
+    def __init__(self, job_id: str, app_id: str):
+        super().__init__(f"App {app_id} is already being processed by job {job_id}")
+        self.job_id = job_id
+        self.app_id = app_id
+
+class JobEvents:
+    """Status events of a single job. Exposes put() so it can stand in for the status queue."""
+
+    def __init__(self, job_id: str, app_id: str):
+        self.job_id = job_id
+        self.app_id = app_id
+        self.events: List[dict] = []
+        self.finished = False
+        self._condition = threading.Condition()
+
+    def put(self, event: dict) -> None:
+        with self._condition:
+            self.events.append(event)
+            if event.get("stage") == "all":
+                self.finished = True
+            self._condition.notify_all()
+        record_job_event(self.job_id, event)
+
+    def wait(self, cursor: int, timeout: float) -> List[dict]:
+        """Return the events after cursor, blocking up to timeout if there are none yet."""
+        with self._condition:
+            if cursor >= len(self.events) and not self.finished:
+                self._condition.wait(timeout)
+            return self.events[cursor:]
+
+def record_job_event(job_id: str, event: dict) -> None:
+    values = {"stage": event.get("stage"), "updated_at": datetime.utcnow()}
+    if event.get("stage") == "all":
+        values["status"] = event.get("status")
+    else:
+        values["status"] = "running"
+    if event.get("error"):
+        values["error"] = event["error"]
+
+    # Written on its own connection so a rolled back pipeline session never loses job state.
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(ProcessingJob).where(ProcessingJob.id == job_id).values(**values)
+            )
+    except Exception as e:
+        logger.error(f"Error recording status for job {job_id}: {str(e)}")
+
+class ProcessingWorkerPool:
+    """Fixed number of long-lived worker threads draining a bounded job queue with one app instance.
+
+    While a job is queued or running here its updated_at is refreshed every
+    heartbeat_seconds, so a job whose updated_at has gone stale was left behind
+    by a process that died and can be resumed from its checkpoint. warm_up, if
+    given, runs in the background when the workers start, and they take their
+    first job once it is done: jobs import the same libraries, and importing
+    them from two threads at once can hand one a half-initialized module.
+    """
+
+    def __init__(self, app, workers: int, max_queued: int, heartbeat_seconds: float = 30,
+                 warm_up: Optional[Callable[[], object]] = None):
+        self.app = app
+        self.workers = workers
+        self.heartbeat_seconds = heartbeat_seconds
+        self.warm_up = warm_up
+        self._pending = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._warmed_up = threading.Event()
+        if not warm_up:
+            self._warmed_up.set()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"processing-worker-{index}")
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(target=self._heartbeat, name="processing-heartbeat")
+            heartbeat.daemon = True
+            heartbeat.start()
+            self._threads.append(heartbeat)
+            if self.warm_up:
+                warm_up = threading.Thread(target=self._warm_up, name="processing-warm-up")
+                warm_up.daemon = True
+                warm_up.start()
+            logger.info(f"Started {self.workers} processing workers")
+
+    def start(self) -> None:
+        """Start the workers (and their warm-up) now instead of on the first job."""
+        self._ensure_started()
+
+    def join(self) -> None:
+        """Block until every job queued so far has finished."""
+        self._pending.join()
+
+    def submit(self, app_id: str, target: Callable[[str, JobEvents], None], full_refresh: bool = False) -> JobEvents:
+        """Queue target(app_id, events) and return the job's events immediately.
+
+        full_refresh is stored on the job for target to read, so it survives a resume.
+        If the app already has a queued or running job, no new job is queued: its
+        events are returned when it runs here, and JobAlreadyActive is raised when
+        another process holds it.
+        """
+        self._ensure_started()
+
+        with self._submit_lock:
+            active = self._active_job_id(app_id)
+            if active:
+                events = self.get(active)
+                if events is None:
+                    raise JobAlreadyActive(active, app_id)
+                logger.info(f"App {app_id} already has processing job {active}")
+                return events
+
+            job_id = uuid.uuid4().hex
+            events = JobEvents(job_id, app_id)
+            db.session.add(ProcessingJob(id=job_id, app_id=app_id, status="queued", full_refresh=full_refresh))
+            db.session.commit()
+
+            try:
+                self._enqueue(events, target)
+            except JobQueueFull:
+                db.session.delete(db.session.get(ProcessingJob, job_id))
+                db.session.commit()
+                raise
+
+        logger.info(f"Queued processing job {job_id} for app {app_id}")
+        return events
+
+    def _active_job_id(self, app_id: str) -> Optional[str]:
+        # Jobs left behind by a dead process stop counting once their heartbeat goes stale.
+        stale_after = self.app.config.get("JOB_RESUME_AFTER", 120)
+        job_id = db.session.execute(
+            select(ProcessingJob.id).where(
+                ProcessingJob.app_id == app_id,
+                ProcessingJob.status.in_(("queued", "running")),
+                ProcessingJob.updated_at >= datetime.utcnow() - timedelta(seconds=stale_after)
+            ).order_by(ProcessingJob.created_at.desc()).limit(1)
+        ).scalar_one_or_none()
+        db.session.commit()
+        return job_id
+
+    def resume(self, job_id: str, target: Callable[[str, JobEvents], None]) -> Optional[JobEvents]:
+        """Queue a failed job again under its own id; target picks up from the job's checkpoint.
+
+        Returns None if the job does not exist or has not failed.
+        """
+        return self._claim(job_id, target, ProcessingJob.status == "failed")
+
+    def resume_interrupted(self, target: Callable[[str, JobEvents], None], stale_after: float) -> List[str]:
+        """Resume queued or running jobs no process has heartbeat for in stale_after seconds.
+
+        Safe to call from several processes at once: each job is claimed by
+        exactly one of them. Returns the ids of the jobs resumed here.
+        """
+        interrupted = (
+            ProcessingJob.status.in_(("queued", "running")),
+            ProcessingJob.updated_at < datetime.utcnow() - timedelta(seconds=stale_after)
+        )
+        job_ids = db.session.execute(select(ProcessingJob.id).where(*interrupted)).scalars().all()
+        db.session.commit()
+
+        resumed = []
+        for job_id in job_ids:
+            try:
+                if self._claim(job_id, target, *interrupted):
+                    resumed.append(job_id)
+            except JobQueueFull:
+                logger.warning(f"Processing queue is full; {len(job_ids) - len(resumed)} interrupted jobs left for later")
+                break
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} interrupted processing jobs")
+        return resumed
+
+    def _claim(self, job_id: str, target: Callable[[str, JobEvents], None], *conditions) -> Optional[JobEvents]:
+        self._ensure_started()
+
+        with db.engine.begin() as connection:
+            job = connection.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job_id, *conditions)
+                .values(status="queued", error=None, updated_at=datetime.utcnow())
+                .returning(ProcessingJob.app_id)
+            ).one_or_none()
+        if job is None:
+            return None
+
+        events = JobEvents(job_id, job.app_id)
+        try:
+            self._enqueue(events, target)
+        except JobQueueFull as e:
+            record_job_event(job_id, {"stage": "all", "status": "failed", "error": str(e)})
+            raise
+
+        logger.info(f"Resuming processing job {job_id} for app {job.app_id}")
+        return events
+
+    def _enqueue(self, events: JobEvents, target: Callable[[str, JobEvents], None]) -> None:
+        try:
+            self._pending.put_nowait((events, target))
+        except queue.Full:
+            PROCESSING_JOBS_REJECTED.inc()
+            raise JobQueueFull(f"Processing queue is full ({self._pending.maxsize} jobs waiting)")
+        PROCESSING_QUEUE_DEPTH.inc()
+
+        with self._lock:
+            self._jobs[events.job_id] = events
+            self._evict_finished()
+
+    def get(self, job_id: str) -> Optional[JobEvents]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queued_count(self) -> int:
+        return self._pending.qsize()
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, events in self._jobs.items() if events.finished]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY_SIZE)]:
+            del self._jobs[job_id]
+
+    def _warm_up(self) -> None:
+        try:
+            with self.app.app_context():
+                self.warm_up()
+        except Exception as e:
+            logger.error(f"Error warming up processing workers: {str(e)}")
+        finally:
+            self._warmed_up.set()
+
+    def _heartbeat(self) -> None:
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                job_ids = [job_id for job_id, events in self._jobs.items() if not events.finished]
+            if not job_ids:
+                continue
+            try:
+                with self.app.app_context(), db.engine.begin() as connection:
+                    connection.execute(
+                        update(ProcessingJob)
+                        .where(ProcessingJob.id.in_(job_ids), ProcessingJob.status.in_(("queued", "running")))
+                        .values(updated_at=datetime.utcnow())
+                    )
+            except Exception as e:
+                logger.error(f"Error recording processing job heartbeat: {str(e)}")
+
+    def _work(self) -> None:
+        self._warmed_up.wait()
+        while True:
+            events, target = self._pending.get()
+            PROCESSING_QUEUE_DEPTH.dec()
+            PROCESSING_JOBS_RUNNING.inc()
+            try:
+                with self.app.app_context():
+                    try:
+                        target(events.app_id, events)
+                    except Exception as e:
+                        logger.error(f"Processing job {events.job_id} crashed: {str(e)}", exc_info=True)
+                        events.put({"stage": "all", "status": "failed", "error": str(e)})
+
+                    # A stage that fails returns early without a final event; close the job out
+                    # with the first error, since stages that fail after it only report the fallout.
+                    if not events.finished:
+                        errors = [event["error"] for event in events.events if event.get("error")]
+                        events.put({
+                            "stage": "all",
+                            "status": "failed",
+                            "error": errors[0] if errors else "Processing stopped"
+                        })
+                PROCESSING_JOBS.labels(status=events.events[-1].get("status", "failed")).inc()
+            finally:
+                PROCESSING_JOBS_RUNNING.dec()
+                self._pending.task_done()
+
+def init_worker_pool(app) -> ProcessingWorkerPool:
+    warm_up = None
+    if app.config.get("WARM_UP_WORKERS", True):
+        from .warmup import warm_up_pipeline
+        warm_up = warm_up_pipeline
+
+    pool = ProcessingWorkerPool(
+        app,
+        workers=app.config.get("PROCESSING_WORKERS", 4),
+        max_queued=app.config.get("PROCESSING_QUEUE_SIZE", 100),
+        heartbeat_seconds=app.config.get("JOB_HEARTBEAT_SECONDS", 30),
+        warm_up=warm_up
+    )
+    app.extensions["processing_worker_pool"] = pool
+    return pool
+
+def start_worker_pool(app, target: Callable[[str, JobEvents], None]) -> List[str]:
+    """Start the app's processing workers and resume the jobs dead processes left behind.
+
+    Only for the process that serves the pool (wsgi.py, `flask run`); other
+    CLI commands and scripts that build an app must not take jobs over. Jobs
+    are resumed with target unless RESUME_INTERRUPTED_JOBS is off; returns
+    their ids.
+    """
+    pool = app.extensions["processing_worker_pool"]
+    if app.config.get("WARM_UP_ON_STARTUP"):
+        pool.start()
+    if not app.config.get("RESUME_INTERRUPTED_JOBS"):
+        return []
+    with app.app_context():
+        try:
+            return pool.resume_interrupted(target, app.config.get("JOB_RESUME_AFTER", 120))
+        except Exception as e:
+            logger.error(f"Error resuming interrupted processing jobs: {str(e)}")
+            return []
+
+def get_worker_pool() -> ProcessingWorkerPool:
+    return current_app.extensions["processing_worker_pool"]
@@ -0,0 +1,146 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Optional
+from .. import logger
+
+UNKNOWN_LANGUAGE = 'unknown'
+
+_langdetect = None
+
+def load_langdetect():
+    """Import langdetect on first use; its language profiles load on the first detection."""
+    global _langdetect
+    if _langdetect is None:
+        import langdetect
+        # langdetect samples randomly; a fixed seed makes a text's language stable
+        # across runs and processes.
+        langdetect.DetectorFactory.seed = 0
+        _langdetect = langdetect
+    return _langdetect
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+# Frequent function words of the Latin-script languages reviews mostly come in.
+# Words shared by several lists are dropped below, so a hit always points at
+# exactly one language.
+_FUNCTION_WORDS = {
+    'en': "the and is it to of this that you was for with but not have are my very i app they be just "
+          "can it's so on all would when what your been has had get will at me too",
+    'es': "el la los las que de y es muy no por para una pero con se lo del mi aplicación esta como "
+          "más me le bien todo",
+    'fr': "le la les est et des une pas pour que du très je il dans sur mais avec ce qui application "
+          "plus tout bien",
+    'de': "der die das und ist nicht ich es sehr zu mit ein eine auf für sich den auch aber wenn "
+          "noch nur immer gut",
+    'pt': "o os que de e é um uma não para com muito mas por mais eu aplicativo isso bem",
+    'it': "il di che e è non un una per con sono molto ma ho mi questa app applicazione più bene",
+}
+_word_counts = Counter(word for words in _FUNCTION_WORDS.values() for word in set(words.split()))
+FUNCTION_WORDS = {
+    language: frozenset(word for word in words.split() if _word_counts[word] == 1)
+    for language, words in _FUNCTION_WORDS.items()
+}
+
+# Scripts used by a single language; other non-Latin scripts (Cyrillic, Arabic,
+# Han, ...) are shared and go to the full detector.
+SCRIPT_LANGUAGES = {
+    'HIRAGANA': 'ja', 'KATAKANA': 'ja', 'HANGUL': 'ko', 'THAI': 'th',
+    'GREEK': 'el', 'HEBREW': 'he', 'GEORGIAN': 'ka', 'ARMENIAN': 'hy',
+}
+
+MIN_PREFILTER_WORDS = 3
+MIN_FUNCTION_WORD_RATE = 0.2
+MIN_LATIN_RATIO = 0.9
+
+def script_of(char: str) -> str:
+    try:
+        return unicodedata.name(char).split(' ')[0]
+    except ValueError:
+        return 'UNKNOWN'
+
+def prefilter_language(text: str) -> Optional[str]:
+    """Cheap detection of the obvious cases; None when the text needs the full detector.
+
+    Mostly non-Latin text is classified by a script only one language uses.
+    Latin text is classified when enough of its words are function words of
+    one language and at least twice as many as of any other.
+    """
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return UNKNOWN_LANGUAGE
+
+    scripts = Counter(script_of(char) for char in letters)
+    latin_ratio = scripts['LATIN'] / len(letters)
+    if latin_ratio < 1 - MIN_LATIN_RATIO:
+        script, count = scripts.most_common(1)[0]
+        if script == 'CJK':
+            # Kanji-only text is rare in Japanese; any kana decides it.
+            script = next((name for name in ('HIRAGANA', 'KATAKANA') if scripts[name]), script)
+        return SCRIPT_LANGUAGES.get(script)
+    if latin_ratio < MIN_LATIN_RATIO:
+        return None
+
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < MIN_PREFILTER_WORDS:
+        return None
+
+    hits = Counter({
+        language: sum(word in function_words for word in words)
+        for language, function_words in FUNCTION_WORDS.items()
+    }).most_common(2)
+    (best_language, best_hits), (_, runner_up_hits) = hits
+    if best_hits / len(words) >= MIN_FUNCTION_WORD_RATE and best_hits >= 2 * runner_up_hits:
+        return best_language
+    return None
+
+def full_detect_language(text: str) -> str:
+    langdetect = load_langdetect()
+    try:
+        return langdetect.detect(text)
+    except langdetect.LangDetectException:
+        return UNKNOWN_LANGUAGE
+    except Exception as e:
+        logger.error(f"Error detecting language: {str(e)}")
+        return UNKNOWN_LANGUAGE
+
+class LanguageCache:
+    """Per-process LRU of detected languages keyed by a digest of the text."""
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            language = self._entries.get(key)
+            if language is not None:
+                self._entries.move_to_end(key)
+            return language
+
+    def set(self, key: bytes, language: str) -> None:
+        with self._lock:
+            self._entries[key] = language
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+language_cache = LanguageCache()
+
+def detect_language(text: str) -> str:
+    """Language code of text: prefilter first, seeded langdetect for the ambiguous rest."""
+    key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    language = language_cache.get(key)
+    if language is None:
+        language = prefilter_language(text) or full_detect_language(text)
+        language_cache.set(key, language)
+    return language
+
+def is_english(text: str) -> bool:
+    return detect_language(text) == 'en'
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+from flask import current_app
+from ..logger import get_logger
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.decomposition import LatentDirichletAllocation
+
+logger = get_logger(__name__)
+
+# Bump when the layout of a saved model changes so older files are ignored.
+REGISTRY_FORMAT_VERSION = 1
+
+DEFAULT_REGISTRY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'model_registry')
+
+@dataclass
+class TopicModel:
+    vectorizer: CountVectorizer
+    lda_model: LatentDirichletAllocation
+    # Topic.id of each LDA component, in component order.
+    topic_ids: List[int]
+    metadata: Dict = field(default_factory=dict)
+
+_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+def get_registry_dir() -> str:
+    registry_dir = current_app.config.get("MODEL_REGISTRY_DIR") or DEFAULT_REGISTRY_DIR
+    os.makedirs(registry_dir, exist_ok=True)
+    return registry_dir
+
+def get_model_path(app_id: str) -> str:
+    safe_app_id = re.sub(r'[^A-Za-z0-9._-]', '_', app_id)
+    return os.path.join(get_registry_dir(), f"{safe_app_id}.joblib")
+
+def save_topic_model(app_id: str, vectorizer: CountVectorizer, lda_model: LatentDirichletAllocation,
+                     topic_ids: List[int], documents: int = 0) -> TopicModel:
+    import joblib
+    import sklearn
+
+    model = TopicModel(
+        vectorizer=vectorizer,
+        lda_model=lda_model,
+        topic_ids=list(topic_ids),
+        metadata={
+            "format_version": REGISTRY_FORMAT_VERSION,
+            "sklearn_version": sklearn.__version__,
+            "app_id": app_id,
+            "num_topics": len(topic_ids),
+            "documents": documents,
+            "created_at": datetime.utcnow().isoformat()
+        }
+    )
+
+    path = get_model_path(app_id)
+    temp_path = f"{path}.tmp"
+    joblib.dump(model, temp_path)
+    os.replace(temp_path, path)
+
+    with _cache_lock:
+        _cache[app_id] = (os.path.getmtime(path), model)
+    logger.info(f"Saved topic model for app {app_id} to {path}")
+    return model
+
+def load_topic_model(app_id: str) -> Optional[TopicModel]:
+    """Return the app's fitted topic model, or None if there is no usable one on disk.
+
+    Models are cached in process and reloaded only when the file changes.
+    """
+    path = get_model_path(app_id)
+    if not os.path.exists(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _cache.get(app_id)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    import joblib
+    import sklearn
+
+    try:
+        model = joblib.load(path)
+    except Exception as e:
+        logger.error(f"Error loading topic model for app {app_id}: {str(e)}")
+        return None
+
+    if model.metadata.get("format_version") != REGISTRY_FORMAT_VERSION:
+        logger.warning(f"Ignoring topic model for app {app_id} with format version {model.metadata.get('format_version')}")
+        return None
+    if model.metadata.get("sklearn_version") != sklearn.__version__:
+        logger.warning(f"Ignoring topic model for app {app_id} saved with scikit-learn {model.metadata.get('sklearn_version')}")
+        return None
+
+    with _cache_lock:
+        _cache[app_id] = (mtime, model)
+    return model
+
+def delete_topic_model(app_id: str) -> None:
+    with _cache_lock:
+        _cache.pop(app_id, None)
+    path = get_model_path(app_id)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,46 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+from flask import current_app
+
+def pool_workers(configured: Optional[int] = None) -> int:
+    """Size of one stage's process pool: configured if set, else this job's share of the cores.
+
+    Up to PROCESSING_WORKERS jobs run at once and each stage pool lives only
+    as long as its stage, so by default the cores are split between the jobs
+    rather than every job spawning a process per core. Needs an app context.
+    """
+    if configured:
+        return configured
+    concurrent_jobs = max(1, current_app.config.get("PROCESSING_WORKERS", 4))
+    return max(1, (os.cpu_count() or 1) // concurrent_jobs)
+
+def map_in_order(function: Callable, items: Iterable, prepare: Callable, workers: int = 1,
+                 initializer: Optional[Callable] = None) -> Iterator[Tuple[Any, Any]]:
+    """Yield (item, function(prepare(item))) for each item, in the items' order.
+
+    prepare runs here and turns an item (e.g. a batch of rows) into the plain
+    data sent to function. With several workers each payload goes to a process
+    pool as one message and up to workers * 2 are in flight, so the work uses
+    every core while the caller still consumes results in order.
+    """
+    if workers <= 1:
+        if initializer:
+            initializer()
+        for item in items:
+            yield item, function(prepare(item))
+        return
+
+    # spawn rather than fork: the web process runs worker and request threads.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=initializer) as executor:
+        in_flight = deque()
+        for item in items:
+            in_flight.append((item, executor.submit(function, prepare(item))))
+            if len(in_flight) >= workers * 2:
+                item, future = in_flight.popleft()
+                yield item, future.result()
+        while in_flight:
+            item, future = in_flight.popleft()
+            yield item, future.result()
@@ -0,0 +1,211 @@
+import threading
+from itertools import chain
+from functools import partial
+from typing import Callable, Iterator, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import select, or_, and_
+from ..models import Review, App
+from .bulkUpdate import bulk_update_reviews
+from .sentimentAnalysis import SCORERS, resolve_scorer
+from .languageDetection import detect_language
+from .textPreprocessing import clean_text, needs_preprocessing, warm_text_worker, TextResourcesMissing
+from .topicExtraction import initialize_models, update_lda_model, reset_topics, save_topic_results
+from .processPool import map_in_order, pool_workers
+from .jobCheckpoint import JobCheckpointer
+from ..metrics import count_reviews
+from .. import db, logger
+
+def annotate_rows(rows: List[Tuple[int, str, Optional[float], Optional[str], Optional[str]]],
+                  scorer: Optional[str]) -> List[Tuple[int, Optional[float], str, Optional[str]]]:
+    """Fill in whatever is missing of (id, content, sentiment_score, language, cleaned_content).
+
+    Returns (id, sentiment_score, language, cleaned_content); without a scorer
+    sentiment is left as is. Runs inside pool workers, so it only touches
+    plain data.
+    """
+    score = SCORERS[scorer] if scorer else None
+    results = []
+    for review_id, content, sentiment_score, language, cleaned_content in rows:
+        try:
+            if score and sentiment_score is None:
+                sentiment_score = round(score(content), 1)
+            if language is None:
+                language = detect_language(content)
+            if language == 'en' and cleaned_content is None:
+                cleaned_content = clean_text(content)
+            results.append((review_id, sentiment_score, language, cleaned_content))
+        except TextResourcesMissing:
+            raise
+        except Exception as e:
+            logger.error(f"Error annotating review {review_id}: {str(e)}")
+    return results
+
+def pending_annotations(reviews_batch, score_sentiment: bool = True) -> list:
+    return [
+        tuple(review)
+        for review in reviews_batch
+        if (score_sentiment and review.sentiment_score is None) or needs_preprocessing(review.language, review.cleaned_content)
+    ]
+
+def missing_annotations(score_sentiment: bool = True):
+    """SQL condition for the reviews pending_annotations would pick."""
+    condition = or_(Review.language.is_(None), and_(Review.language == 'en', Review.cleaned_content.is_(None)))
+    if score_sentiment:
+        condition = or_(Review.sentiment_score.is_(None), condition)
+    return condition
+
+def iter_annotation_batches(app_id: str, batch_size: int, start_after: int = 0, only_missing: bool = False,
+                            score_sentiment: bool = True, source_finished: Optional[threading.Event] = None,
+                            source_progress: Optional[threading.Event] = None,
+                            poll_interval: float = 1.0) -> Iterator[list]:
+    """Stream the app's reviews in id order, one keyset-paged query per batch.
+
+    only_missing skips reviews that have every annotation already. With
+    source_finished, the app's reviews are followed while another thread is
+    still inserting them: reviews get increasing ids, so once the stored ones
+    are read this waits on source_progress for more and ends when
+    source_finished is set and nothing new is left.
+    """
+    last_id = start_after
+    while True:
+        finished = source_finished is None or source_finished.is_set()
+        query = select(Review.id, Review.content, Review.sentiment_score, Review.language, Review.cleaned_content)\
+            .where(Review.app_id == app_id, Review.id > last_id)
+        if only_missing:
+            query = query.where(missing_annotations(score_sentiment))
+        reviews_batch = db.session.execute(query.order_by(Review.id).limit(batch_size)).all()
+        if reviews_batch:
+            last_id = reviews_batch[-1].id
+            yield reviews_batch
+            continue
+        if finished:
+            return
+        source_progress.wait(poll_interval)
+        source_progress.clear()
+
+def annotate_reviews(app_id: str, fit_topics: bool = True, num_topics: int = 10, words_per_topic: int = 8,
+                     batch_size: int = 1000, scorer: Optional[str] = None, workers: Optional[int] = None,
+                     score_sentiment: bool = True, checkpoint: Optional[JobCheckpointer] = None,
+                     source_finished: Optional[threading.Event] = None,
+                     source_progress: Optional[threading.Event] = None,
+                     source_error: Optional[Callable[[], Optional[str]]] = None) -> dict:
+    """Score sentiment, detect language, clean text and fit topics in a single scan of the app's reviews.
+
+    Each batch is read once, only its missing annotations are computed (in a
+    process pool when there are several workers), and all changed columns are
+    written back with one bulk update. With fit_topics the app's topics are
+    replaced by an LDA model fit on the same batches; without it only reviews
+    missing an annotation are read. Without score_sentiment the sentiment
+    column is neither computed nor written.
+
+    Pass a concurrent extraction's finished and progress events to annotate
+    reviews as they are committed (see iter_annotation_batches); a last sweep
+    then picks up stored reviews the extraction edited, which reset their
+    annotations behind the scan. If source_error() then returns the error the
+    extraction failed with, this raises with it instead of saving topics fit
+    on part of the reviews.
+    With a checkpoint, the partially fit model is
+    saved with every batch and a job that saved one continues fitting after
+    its last batch. Returns counts of the reviews scanned and updated and the
+    documents the model was fit on.
+    """
+    try:
+        scorer = resolve_scorer(scorer)
+        workers = pool_workers(workers or current_app.config.get("PREPROCESSING_WORKERS"))
+
+        if not db.session.get(App, app_id):
+            raise ValueError(f"App with ID {app_id} not found")
+
+        following = source_finished is not None
+        total_reviews = Review.query.filter_by(app_id=app_id).count()
+        if total_reviews <= batch_size and not following:
+            workers = 1
+
+        summary = {"reviews": 0, "updated": 0, "documents": 0}
+        non_english_count = 0
+        start_after = 0
+
+        if fit_topics:
+            # Also on resume: the interrupted run may have saved topics after the checkpoint.
+            reset_topics(app_id)
+            resumed = checkpoint.topic_model_progress() if checkpoint else None
+            if resumed:
+                # Reviews up to the checkpoint are annotated and already in the model.
+                vectorizer, lda_model = resumed.vectorizer, resumed.lda_model
+                start_after = resumed.last_review_id
+                summary["documents"] = resumed.documents
+                logger.info(f"Resuming topic extraction for app_id: {app_id} after review {start_after} "
+                            f"({resumed.documents} documents already fit)")
+            else:
+                vectorizer, lda_model = initialize_models(num_topics)
+
+        batches = iter_annotation_batches(
+            app_id, batch_size, start_after, only_missing=not fit_topics, score_sentiment=score_sentiment,
+            source_finished=source_finished, source_progress=source_progress
+        )
+        if following:
+            # Starts only once the scan above is exhausted, i.e. after the extraction finished.
+            batches = chain(batches, iter_annotation_batches(
+                app_id, batch_size, only_missing=True, score_sentiment=score_sentiment
+            ))
+        annotate = partial(annotate_rows, scorer=scorer if score_sentiment else None)
+        pending = partial(pending_annotations, score_sentiment=score_sentiment)
+        last_review_id = start_after
+        for reviews_batch, results in map_in_order(annotate, batches, pending, workers, warm_text_worker):
+            annotated = {review_id: values for review_id, *values in results}
+            # Batches of the final sweep go back to ids the model has already seen.
+            sweeping = reviews_batch[0].id <= last_review_id
+            last_review_id = max(last_review_id, reviews_batch[-1].id)
+
+            updates = []
+            cleaned_texts = []
+            for review in reviews_batch:
+                stored = (review.sentiment_score, review.language, review.cleaned_content)
+                sentiment_score, language, cleaned_content = annotated.get(review.id, stored)
+                if (sentiment_score, language, cleaned_content) != stored:
+                    update = {"id": review.id, "language": language, "cleaned_content": cleaned_content}
+                    if score_sentiment:
+                        update["sentiment_score"] = sentiment_score
+                    updates.append(update)
+                if language != 'en':
+                    non_english_count += 1
+                elif cleaned_content:
+                    cleaned_texts.append(cleaned_content)
+
+            if fit_topics and cleaned_texts and not sweeping:
+                try:
+                    update_lda_model(cleaned_texts, vectorizer, lda_model, is_first_batch=not summary["documents"])
+                    summary["documents"] += len(cleaned_texts)
+                except Exception as e:
+                    logger.error(f"Error in batch processing: {str(e)}")
+
+            # The model is fit before committing so its checkpoint lands with the batch's updates.
+            if updates:
+                bulk_update_reviews(updates)
+            if fit_topics and checkpoint and not sweeping:
+                checkpoint.save_topic_model(vectorizer, lda_model, last_review_id, summary["documents"])
+            db.session.commit()
+            count_reviews("annotation", len(reviews_batch))
+
+            summary["reviews"] += len(reviews_batch)
+            summary["updated"] += len(updates)
+            logger.info(f"Annotated {summary['reviews']} reviews for app_id: {app_id}. "
+                        f"Omitted {non_english_count} non-english reviews from topics.")
+
+        extraction_error = source_error() if source_error else None
+        if extraction_error:
+            raise RuntimeError(f"Review extraction failed: {extraction_error}")
+
+        if fit_topics:
+            if summary["documents"]:
+                save_topic_results(app_id, vectorizer, lda_model, num_topics, words_per_topic, summary["documents"])
+                logger.info(f"Successfully extracted {num_topics} topics for app_id: {app_id}")
+            else:
+                logger.warning(f"No valid texts found for topic modeling for app_id: {app_id}")
+
+        return summary
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Critical error in review annotation for app_id {app_id}: {str(e)}")
+        raise
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from typing import Iterator
+from sqlalchemy import select
+from ..models import Review, Topic
+from .. import db, logger
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_COLUMNS = ["id", "source_review_id", "name", "rating", "content", "date", "sentiment_score", "topic_id", "topic", "language"]
+
+def export_query(app_id: str):
+    return select(
+        Review.id,
+        Review.source_review_id,
+        Review.name,
+        Review.rating,
+        Review.content,
+        Review.date,
+        Review.sentiment_score,
+        Review.topic_id,
+        Topic.content.label("topic"),
+        Review.language
+    ).outerjoin(Topic, Topic.id == Review.topic_id)\
+     .where(Review.app_id == app_id)\
+     .order_by(Review.id)
+
+def format_ndjson(rows) -> str:
+    return "".join(
+        json.dumps({**row._asdict(), "date": row.date.isoformat()}) + "\n"
+        for row in rows
+    )
+
+def format_csv(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [row.id, row.source_review_id, row.name, row.rating, row.content, row.date.isoformat(),
+         row.sentiment_score, row.topic_id, row.topic, row.language]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+def iter_review_export(app_id: str, export_format: str = "ndjson", chunk_size: int = 1000) -> Iterator[str]:
+    """Yield an app's reviews with their annotations as NDJSON or CSV text, chunk by chunk.
+
+    Rows come from a server-side cursor (a named cursor on Postgres) on a
+    dedicated connection, so memory stays at one chunk whatever the app size.
+    Must run inside an app context, e.g. under stream_with_context.
+    """
+    formatter = format_csv if export_format == "csv" else format_ndjson
+    if export_format == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\r\n"
+
+    exported = 0
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, max_row_buffer=chunk_size)\
+            .execute(export_query(app_id))
+        for rows in result.partitions(chunk_size):
+            exported += len(rows)
+            yield formatter(rows)
+
+    logger.info(f"Exported {exported} reviews of app {app_id} as {export_format}")
@@ -1,14 +1,25 @@
-from google_play_scraper import app as appScraper, reviews_all, Sort, reviews
-from datetime import datetime
+import queue
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
 from flask import current_app
-from sqlalchemy import select
+from sqlalchemy import select, insert, func
 from .. import db
-from ..models import App, Review
+from ..models import App, Review, Topic
+from .modelRegistry import delete_topic_model
+from .bulkUpdate import bulk_update_reviews
+from .reviewSources import ReviewSource, default_review_source
+from .reviewSearch import invalidate_search_index
+from .jobCheckpoint import JobCheckpointer
+from ..metrics import count_reviews
 from ..logger import get_logger
 
 logger = get_logger(__name__)
 
-def sanitize_review_data(review_data, app_id):
+END_OF_PAGES = None
+
+def sanitize_review_row(review_data, app_id) -> dict:
     try:
         username = review_data['userName']
         if len(username) > 50:
@@ -26,82 +37,358 @@ def sanitize_review_data(review_data, app_id):
         if isinstance(review_data['at'], datetime):
             date = review_data['at']
         else:
-            date = datetime.now(datetime.timezone.utc)
-
-        return Review(
-            app_id=app_id,
-            name=username,
-            rating=rating,
-            content=content,
-            date=date
-        )
+            # Stored naive in UTC like the scraper's own dates so they stay comparable.
+            date = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        return {
+            "app_id": app_id,
+            "name": username,
+            "rating": rating,
+            "content": content,
+            "date": date,
+            "source_review_id": review_data.get('reviewId') or None
+        }
     except Exception as e:
         logger.error(f"Error sanitizing review data: {str(e)}")
         raise
 
-def extract_reviews(appID, limit=30000):
+def sanitize_review_data(review_data, app_id):
+    return Review(**sanitize_review_row(review_data, app_id))
+
+def write_reviews(rows: List[dict], bulk: bool = True, before_commit: Optional[Callable[[], None]] = None) -> None:
+    """Write a batch of sanitized review rows and commit.
+
+    The bulk path sends the batch as a single executemany INSERT on the review
+    table and never builds ORM objects; the ORM path adds one Review per row.
+    before_commit can add more writes (e.g. a checkpoint) to the same transaction.
+    """
+    if bulk:
+        if rows:
+            db.session.execute(insert(Review.__table__), rows)
+    else:
+        for row in rows:
+            db.session.add(Review(**row))
+    if before_commit:
+        before_commit()
+    db.session.commit()
+    count_reviews("review_extraction", len(rows))
+
+# Annotations an edited review no longer matches; later stages redo them.
+EDITED_REVIEW_RESET = {"sentiment_score": None, "language": None, "cleaned_content": None, "topic_id": None}
+
+def split_stored_reviews(rows: List[dict], app_id) -> Tuple[List[dict], List[dict]]:
+    """Split rows into new reviews and updates to reviews already stored under their source review ID.
+
+    Rows identical to the stored review, and repeats of a source review ID
+    within the batch, are dropped. Updates hold "id" plus the edited columns,
+    with the review's annotations reset, for bulk_update_reviews.
+    """
+    source_ids = [row["source_review_id"] for row in rows if row.get("source_review_id")]
+    stored = {}
+    if source_ids:
+        stored = {
+            stored_review.source_review_id: stored_review
+            for stored_review in db.session.execute(
+                select(Review.id, Review.source_review_id, Review.name, Review.rating, Review.content, Review.date)
+                .where(Review.app_id == app_id, Review.source_review_id.in_(source_ids))
+            )
+        }
+
+    new_rows, updates = [], []
+    seen = set()
+    for row in rows:
+        source_id = row.get("source_review_id")
+        if source_id:
+            if source_id in seen:
+                continue
+            seen.add(source_id)
+        stored_review = stored.get(source_id)
+        if stored_review is None:
+            new_rows.append(row)
+        elif (stored_review.name, stored_review.rating, stored_review.content, stored_review.date) \
+                != (row["name"], row["rating"], row["content"], row["date"]):
+            updates.append({
+                "id": stored_review.id,
+                "name": row["name"],
+                "rating": row["rating"],
+                "content": row["content"],
+                "date": row["date"],
+                **EDITED_REVIEW_RESET
+            })
+    return new_rows, updates
+
+def write_review_batch(rows: List[dict], app_id, bulk: bool = True,
+                       before_commit: Optional[Callable[[], None]] = None) -> Tuple[int, int]:
+    """Insert the batch's new reviews, update the ones edited since they were stored, and commit.
+
+    Returns (inserted, updated).
+    """
+    new_rows, updates = split_stored_reviews(rows, app_id)
+    bulk_update_reviews(updates)
+    write_reviews(new_rows, bulk=bulk, before_commit=before_commit)
+    if updates:
+        invalidate_search_index(app_id)
+    return len(new_rows), len(updates)
+
+def get_refresh_watermark(appID, newest_date: Optional[datetime] = None):
+    """Newest stored review date for the app and the (name, content) pairs stored at that date.
+
+    Pass newest_date to use another watermark, such as App.reviews_complete_through
+    or that of a refresh that already began. The pairs only matter for reviews
+    stored without a source review ID.
+    """
+    if newest_date is None:
+        newest_date = db.session.query(func.max(Review.date)).filter(Review.app_id == appID).scalar()
+    if newest_date is None:
+        return None, set()
+
+    reviews_at_newest = db.session.query(Review.name, Review.content)\
+        .filter(Review.app_id == appID, Review.date == newest_date)\
+        .all()
+    return newest_date, {(name, content) for name, content in reviews_at_newest}
+
+def put_until_stopped(page_queue: queue.Queue, item, stop_event: threading.Event) -> bool:
+    while not stop_event.is_set():
+        try:
+            page_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def fetch_review_pages(source: ReviewSource, appID, page_queue: queue.Queue, stop_event: threading.Event,
+                       batch_size: int = 200, resume_token: Optional[str] = None) -> None:
+    """Producer: read the source's (page, token) pairs into page_queue until exhausted or stopped.
+
+    A single fetcher runs ahead of the writer; the bounded queue provides the
+    back-pressure.
+    """
     try:
-        app_data = appScraper(appID, lang='en', country='us')
-        app_record = App(
-            id=appID,
-            name=app_data['title'],
-            description=app_data['description']
-        )
-        
-        app_exec = db.session.execute(select(App).filter_by(id=appID)).scalar_one_or_none()
-        if app_exec:
-            logger.info(f"App {appID} already exists. Deleting existing records to refresh data.")
-            db.session.delete(app_exec)
-            db.session.commit()
+        with closing(source.iter_resumable_pages(appID, batch_size, resume_token)) as pages:
+            for page in pages:
+                if stop_event.is_set() or not put_until_stopped(page_queue, page, stop_event):
+                    break
+    except Exception as e:
+        logger.error(f"Fetching reviews for app {appID} from {source.name} failed: {str(e)}")
+        put_until_stopped(page_queue, e, stop_event)
+    finally:
+        put_until_stopped(page_queue, END_OF_PAGES, stop_event)
+
+def start_page_fetcher(source: ReviewSource, appID, batch_size: int, prefetch_pages: int,
+                       resume_token: Optional[str] = None):
+    """Start fetch_review_pages in a daemon thread and return (page_queue, stop_event, thread)."""
+    page_queue = queue.Queue(maxsize=prefetch_pages)
+    stop_event = threading.Event()
+    fetcher = threading.Thread(
+        target=fetch_review_pages,
+        args=(source, appID, page_queue, stop_event, batch_size, resume_token),
+        name=f"review-fetcher-{appID}"
+    )
+    fetcher.daemon = True
+    fetcher.start()
+    return page_queue, stop_event, fetcher
+
+def extract_reviews(appID, limit=30000, bulk=True, incremental=True, prefetch_pages=5,
+                    source: Optional[ReviewSource] = None, on_batch_committed: Optional[Callable[[], None]] = None,
+                    checkpoint: Optional[JobCheckpointer] = None) -> int:
+    """Scrape the app's reviews into the database and return how many were inserted.
+
+    Reviews come from source, Google Play by default. When the app already
+    exists, a previous scrape of it ran to the end and incremental is set, its
+    stored reviews are kept and only reviews from the newest one that scrape
+    saw onwards are fetched; reviews already stored under the same source
+    review ID are updated if they were edited and skipped otherwise. Otherwise
+    the app is deleted (cascading to its reviews and topics) and scraped from
+    scratch. Up
+    to prefetch_pages pages are fetched in the background while the previous
+    ones are written. on_batch_committed is called once the app record is
+    ready and after every committed batch, so consumers can follow along.
+
+    With a checkpoint, each batch commits together with the source token of
+    its last page, and a job that already committed batches continues after
+    them (keeping the watermark it started with) instead of starting over.
+    """
+    try:
+        source = source or default_review_source()
+        app_data = source.app_details(appID)
+
+        newest_date, reviews_at_newest = None, set()
+        app_record = db.session.execute(select(App).filter_by(id=appID)).scalar_one_or_none()
+        resumed = checkpoint.extraction_progress() if checkpoint and app_record else None
+        if resumed:
+            logger.info(f"Resuming extraction for app {appID} after {resumed.committed_reviews} committed reviews.")
+            if resumed.refresh_since is not None:
+                newest_date, reviews_at_newest = get_refresh_watermark(appID, resumed.refresh_since)
+        elif app_record and incremental and app_record.reviews_complete_through is not None:
+            logger.info(f"App {appID} already exists. Fetching only reviews newer than the stored ones.")
+            app_record.name = app_data['title']
+            app_record.description = app_data['description']
+            newest_date, reviews_at_newest = get_refresh_watermark(appID, app_record.reviews_complete_through)
+        else:
+            if app_record:
+                if incremental and app_record.reviews_complete_through is None:
+                    logger.info(f"App {appID} has no completed scrape. Deleting existing records to scrape it again.")
+                else:
+                    logger.info(f"App {appID} already exists. Deleting existing records to refresh data.")
+                # Bulk deletes, so the cascade never loads the app's reviews into the session
+                Review.query.filter_by(app_id=appID).delete(synchronize_session=False)
+                Topic.query.filter_by(app_id=appID).delete(synchronize_session=False)
+                db.session.delete(app_record)
+                db.session.commit()
+                delete_topic_model(appID)
 
-        db.session.add(app_record)
+            app_record = App(
+                id=appID,
+                name=app_data['title'],
+                description=app_data['description']
+            )
+            db.session.add(app_record)
         db.session.commit()
+        if on_batch_committed:
+            on_batch_committed()
 
-        review_count = 0
+        review_count = resumed.committed_reviews if resumed else 0
         skipped_count = 0
+        updated_count = 0
         batch_size = 200
-        batch_count = 0
         batch_limit = 1000
+        pending_rows = []
+        reached_stored = False
+        exhausted = False
+        page_token = None
+
+        def save_checkpoint():
+            if checkpoint:
+                checkpoint.save_extraction(page_token, review_count, newest_date)
+
+        def write_pending():
+            nonlocal review_count, updated_count
+            new_rows, updates = split_stored_reviews(pending_rows, appID)
+            bulk_update_reviews(updates)
+            review_count -= len(pending_rows) - len(new_rows)
+            updated_count += len(updates)
+            write_reviews(new_rows, bulk=bulk, before_commit=save_checkpoint)
+            if updates:
+                invalidate_search_index(appID)
 
-        scrape_results, continuation_token = reviews(
-            appID, 
-            lang='en', 
-            sort=Sort.NEWEST, 
-            count=batch_size
+        page_queue, stop_event, fetcher = start_page_fetcher(
+            source, appID, batch_size, prefetch_pages, resumed.continuation_token if resumed else None
         )
-        
-        while review_count < limit and scrape_results:
-            for review in scrape_results:
-                try:
-                    review_row = sanitize_review_data(review, appID)
+
+        try:
+            while review_count < limit and not reached_stored:
+                fetched = page_queue.get()
+                if fetched is END_OF_PAGES:
+                    exhausted = True
+                    break
+                if isinstance(fetched, Exception):
+                    raise fetched
+                scrape_results, page_token = fetched
+
+                for review in scrape_results:
+                    try:
+                        row = sanitize_review_row(review, appID)
+                    except Exception as e:
+                        skipped_count += 1
+                        logger.warning(f"Skipping review due to error: {str(e)}")
+                        continue
+
+                    if newest_date is not None:
+                        if row["date"] < newest_date:
+                            reached_stored = True
+                            break
+                        if row["source_review_id"] is None and row["date"] == newest_date \
+                                and (row["name"], row["content"]) in reviews_at_newest:
+                            continue
+
+                    pending_rows.append(row)
                     review_count += 1
-                    batch_count += 1
-                    db.session.add(review_row)
-                except Exception as e:
-                    skipped_count += 1
-                    logger.warning(f"Skipping review due to error: {str(e)}")
-                    continue
-
-            if batch_count >= batch_limit:
-                logger.info(f"[IN PROGRESS] Committed a batch of {batch_count} reviews. Total so far: {review_count} (Skipped: {skipped_count})")
-                db.session.commit()
-                batch_count = 0
-
-            scrape_results, continuation_token = reviews(
-                appID, 
-                lang='en', 
-                sort=Sort.NEWEST, 
-                count=batch_size, 
-                continuation_token=continuation_token
-            )
 
-        if batch_count > 0:
-            logger.info(f"[IN PROGRESS] Committing final batch of {batch_count} reviews")
-            db.session.commit()
+                if len(pending_rows) >= batch_limit:
+                    write_pending()
+                    logger.info(f"[IN PROGRESS] Committed a batch of {len(pending_rows)} reviews. Total so far: {review_count} (Updated: {updated_count}, Skipped: {skipped_count})")
+                    pending_rows = []
+                    if on_batch_committed:
+                        on_batch_committed()
+        finally:
+            stop_event.set()
+            fetcher.join()
+
+        if pending_rows:
+            logger.info(f"[IN PROGRESS] Committing final batch of {len(pending_rows)} reviews")
+            write_pending()
+            if on_batch_committed:
+                on_batch_committed()
+
+        # The next refresh can start at the newest stored review only if nothing between it
+        # and the previous watermark is missing. A refresh that stopped at limit before
+        # reaching the stored reviews left a gap, so it keeps the old watermark; a scrape
+        # from scratch that stopped at limit holds the newest reviews without one.
+        if reached_stored or exhausted or newest_date is None:
+            app_record.reviews_complete_through = db.session.query(func.max(Review.date))\
+                .filter(Review.app_id == appID).scalar()
+        else:
+            logger.info(f"Refresh for app {appID} stopped at the limit of {limit} reviews before reaching the stored ones; keeping its watermark.")
+        db.session.commit()
 
-        logger.info(f"[COMPLETE] Completed scraping reviews for app {app_record.name} with a total of {review_count} reviews (Skipped: {skipped_count}).")
+        if newest_date is not None:
+            logger.info(f"[COMPLETE] Refreshed reviews for app {app_record.name} with {review_count} new reviews (Updated: {updated_count}, Skipped: {skipped_count}).")
+        else:
+            logger.info(f"[COMPLETE] Completed scraping reviews for app {app_record.name} with a total of {review_count} reviews (Skipped: {skipped_count}).")
+        return review_count
         
     except Exception as e:
         logger.error(f"Review extraction for app {appID} failed: {str(e)}", exc_info=True)
         db.session.rollback()
-        raise
\ No newline at end of file
+        raise
+
+def import_reviews(appID, source: ReviewSource, batch_size: int = 5000, prefetch_pages: int = 4) -> int:
+    """Append every review the source yields to the app and return how many were inserted.
+
+    The app is created from source.app_details if it does not exist. Unlike
+    extract_reviews nothing is deleted and no watermark applies, so the source
+    need not be ordered (historical exports, other stores); reviews already
+    stored under the same source review ID are updated instead. Pages are read
+    in the background while the previous one is written with a single bulk insert.
+    """
+    try:
+        if not db.session.get(App, appID):
+            app_data = source.app_details(appID)
+            db.session.add(App(id=appID, name=app_data['title'], description=app_data['description']))
+            db.session.commit()
+
+        review_count = 0
+        skipped_count = 0
+        page_queue, stop_event, fetcher = start_page_fetcher(source, appID, batch_size, prefetch_pages)
+        try:
+            while True:
+                fetched = page_queue.get()
+                if fetched is END_OF_PAGES:
+                    break
+                if isinstance(fetched, Exception):
+                    raise fetched
+                page, _ = fetched
+
+                rows = []
+                for review in page:
+                    try:
+                        rows.append(sanitize_review_row(review, appID))
+                    except Exception as e:
+                        skipped_count += 1
+                        logger.warning(f"Skipping review due to error: {str(e)}")
+
+                if rows:
+                    inserted, _ = write_review_batch(rows, appID)
+                    review_count += inserted
+                    logger.info(f"[IN PROGRESS] Imported {review_count} reviews for app {appID} (Skipped: {skipped_count})")
+        finally:
+            stop_event.set()
+            fetcher.join()
+
+        logger.info(f"[COMPLETE] Imported {review_count} reviews for app {appID} from {source.name} (Skipped: {skipped_count}).")
+        return review_count
+
+    except Exception as e:
+        logger.error(f"Review import for app {appID} failed: {str(e)}", exc_info=True)
+        db.session.rollback()
+        raise
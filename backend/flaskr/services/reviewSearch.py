@@ -0,0 +1,209 @@
+import base64
+import json
+import math
+import re
+import threading
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import select, func, tuple_, literal_column, cast, Float
+from ..models import Review
+from .. import db, logger
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Small English stopword list so the in-process index drops the same filler words
+# Postgres' 'english' configuration does ("crash on login" -> crash & login).
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my
+myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with you your
+yours yourself yourselves
+""".split())
+
+# Candidate ids are checked against the SQL filters this many at a time.
+FILTER_BATCH_SIZE = 500
+
+class InvalidSearchCursor(ValueError):
+    pass
+
+def encode_search_cursor(rank: float, review_id: int) -> str:
+    payload = json.dumps([rank, review_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, review_id = json.loads(payload)
+        return float(rank), int(review_id)
+    except Exception:
+        raise InvalidSearchCursor("Invalid cursor")
+
+_stemmer = None
+
+@lru_cache(maxsize=100000)
+def stem(token: str) -> str:
+    # Snowball is the stemmer behind Postgres' english configuration, so both
+    # backends match "crashing" to "crash". It needs no NLTK data download.
+    global _stemmer
+    if _stemmer is None:
+        from nltk.stem.snowball import SnowballStemmer
+        _stemmer = SnowballStemmer("english")
+    return _stemmer.stem(token)
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+class InvertedIndex:
+    """Token -> {review_id: term frequency} for one app's reviews."""
+
+    def __init__(self, signature: tuple):
+        self.signature = signature
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.document_count = 0
+
+    def add(self, review_id: int, content: str) -> None:
+        self.document_count += 1
+        for token, count in Counter(tokenize(content)).items():
+            self.postings.setdefault(token, {})[review_id] = count
+
+    def search(self, terms: List[str]) -> List[Tuple[float, int]]:
+        """All reviews containing every term as (tf-idf score, id), best first."""
+        postings = [self.postings.get(term, {}) for term in terms]
+        if not postings or not all(postings):
+            return []
+
+        postings.sort(key=len)
+        matches = set(postings[0]).intersection(*postings[1:])
+        idfs = [math.log(1 + self.document_count / len(posting)) for posting in postings]
+        scored = [
+            (round(sum(posting[review_id] * idf for posting, idf in zip(postings, idfs)), 6), review_id)
+            for review_id in matches
+        ]
+        scored.sort(key=lambda item: (-item[0], -item[1]))
+        return scored
+
+# Least recently searched app first; only SEARCH_INDEX_MAX_APPS indexes are kept.
+_indexes: "OrderedDict[str, InvertedIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def invalidate_search_index(app_id: str) -> None:
+    """Drop this process's index of the app, so the next search rebuilds it."""
+    with _indexes_lock:
+        _indexes.pop(app_id, None)
+
+def get_inverted_index(app_id: str, chunk_size: int = 5000) -> InvertedIndex:
+    """Return the app's in-process index, rebuilding it when reviews were added, removed or edited.
+
+    Edits keep the review count and ids, so the process that writes them
+    drops the index (invalidate_search_index); other processes notice them
+    through the newest review date, as an edit moves a review's date forward.
+    """
+    signature = tuple(db.session.query(func.count(Review.id), func.max(Review.id), func.max(Review.date))
+                      .filter(Review.app_id == app_id).one())
+    with _indexes_lock:
+        index = _indexes.get(app_id)
+        if index and index.signature == signature:
+            _indexes.move_to_end(app_id)
+            return index
+
+    index = InvertedIndex(signature)
+    last_id = 0
+    while True:
+        chunk = db.session.execute(
+            select(Review.id, Review.content)
+            .where(Review.app_id == app_id, Review.id > last_id)
+            .order_by(Review.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for review_id, content in chunk:
+            index.add(review_id, content)
+
+    logger.info(f"Built search index for app {app_id} over {index.document_count} reviews")
+    max_apps = current_app.config.get("SEARCH_INDEX_MAX_APPS", 16)
+    with _indexes_lock:
+        _indexes[app_id] = index
+        _indexes.move_to_end(app_id)
+        while len(_indexes) > max_apps:
+            _indexes.popitem(last=False)
+    return index
+
+def apply_filters(query, rating: Optional[int], topic_id: Optional[int],
+                  start_date: Optional[datetime], end_date: Optional[datetime]):
+    if rating:
+        query = query.where(Review.rating == rating)
+    if topic_id:
+        query = query.where(Review.topic_id == topic_id)
+    if start_date:
+        query = query.where(Review.date >= start_date)
+    if end_date:
+        query = query.where(Review.date < end_date)
+    return query
+
+def search_postgres(app_id, text, filters, cursor, per_page) -> List[Tuple[Review, float]]:
+    ts_query = func.websearch_to_tsquery('english', text)
+    search_vector = literal_column("review.search_vector")
+    # ts_rank_cd returns float4; as float8 it compares exactly with the cursor's
+    # rank, which goes through JSON as a double.
+    rank = cast(func.ts_rank_cd(search_vector, ts_query), Float)
+
+    query = select(Review, rank.label("rank"))\
+        .where(Review.app_id == app_id, search_vector.op("@@")(ts_query))
+    query = apply_filters(query, **filters)
+    if cursor:
+        query = query.where(tuple_(rank, Review.id) < tuple_(*cursor))
+
+    rows = db.session.execute(query.order_by(rank.desc(), Review.id.desc()).limit(per_page + 1)).all()
+    return [(review, float(rank_value)) for review, rank_value in rows]
+
+def search_in_process(app_id, text, filters, cursor, per_page) -> List[Tuple[Review, float]]:
+    scored = get_inverted_index(app_id).search(tokenize(text))
+
+    position = 0
+    if cursor:
+        position = bisect_right([(-score, -review_id) for score, review_id in scored], (-cursor[0], -cursor[1]))
+
+    results = []
+    while position < len(scored) and len(results) <= per_page:
+        batch = scored[position:position + FILTER_BATCH_SIZE]
+        position += len(batch)
+
+        scores = {review_id: score for score, review_id in batch}
+        query = apply_filters(select(Review).where(Review.id.in_(scores)), **filters)
+        matched = {review.id: review for review in db.session.execute(query).scalars()}
+        results.extend((matched[review_id], score) for score, review_id in batch if review_id in matched)
+
+    return results[:per_page + 1]
+
+def search_reviews(app_id: str, text: str, per_page: int = 10, cursor: Optional[str] = None,
+                   rating: Optional[int] = None, topic_id: Optional[int] = None,
+                   start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+    """Full-text search over an app's reviews, best match first.
+
+    Returns [(review, rank)] for one page and the cursor of the next page (or None).
+    Postgres uses the review.search_vector tsvector column and its GIN index;
+    other databases use an in-process inverted index.
+    """
+    filters = {"rating": rating, "topic_id": topic_id, "start_date": start_date, "end_date": end_date}
+    position = decode_search_cursor(cursor) if cursor else None
+
+    if db.session.get_bind().dialect.name == "postgresql":
+        results = search_postgres(app_id, text, filters, position, per_page)
+    else:
+        results = search_in_process(app_id, text, filters, position, per_page)
+
+    next_cursor = None
+    if len(results) > per_page:
+        results = results[:per_page]
+        review, rank = results[-1]
+        next_cursor = encode_search_cursor(rank, review.id)
+    return results, next_cursor
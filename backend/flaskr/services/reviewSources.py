@@ -0,0 +1,168 @@
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+from flask import current_app
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+class ReviewSource:
+    """Where extract_reviews and import_reviews read an app and its reviews from.
+
+    Pages are lists of review dicts shaped like google_play_scraper results
+    (userName, score, content, at and, where the source has one, reviewId),
+    which sanitize_review_row turns into rows.
+    """
+
+    name = "source"
+
+    def app_details(self, app_id: str) -> dict:
+        """Return the app's {"title", "description"}."""
+        raise NotImplementedError
+
+    def iter_pages(self, app_id: str, page_size: int) -> Iterator[List[dict]]:
+        """Yield the app's reviews page by page. extract_reviews expects newest first."""
+        raise NotImplementedError
+
+    def iter_resumable_pages(self, app_id: str, page_size: int,
+                             resume_token: Optional[str] = None) -> Iterator[Tuple[List[dict], str]]:
+        """Yield (page, token) pairs; passing a token back as resume_token continues after its page.
+
+        The default token counts pages, which suits sources that serve the same
+        pages in the same order every time.
+        """
+        skip_pages = int(resume_token or 0)
+        for index, page in enumerate(self.iter_pages(app_id, page_size), start=1):
+            if index > skip_pages:
+                yield page, str(index)
+
+class GooglePlaySource(ReviewSource):
+    name = "google_play"
+
+    def __init__(self, lang: str = 'en', country: str = 'us'):
+        self.lang = lang
+        self.country = country
+
+    def app_details(self, app_id: str) -> dict:
+        from google_play_scraper import app
+        return app(app_id, lang=self.lang, country=self.country)
+
+    def iter_pages(self, app_id: str, page_size: int) -> Iterator[List[dict]]:
+        for page, _ in self.iter_resumable_pages(app_id, page_size):
+            yield page
+
+    def iter_resumable_pages(self, app_id: str, page_size: int,
+                             resume_token: Optional[str] = None) -> Iterator[Tuple[List[dict], str]]:
+        # Continuation tokens chain each page to the previous one, so pages can
+        # only be fetched in order. The token is "" once Play has no more pages.
+        from google_play_scraper import reviews, Sort
+        from google_play_scraper.features.reviews import _ContinuationToken
+        if resume_token == "":
+            return
+        continuation_token = None
+        if resume_token is not None:
+            continuation_token = _ContinuationToken(
+                resume_token, self.lang, self.country, Sort.NEWEST.value, page_size, None, None
+            )
+        while True:
+            page, continuation_token = reviews(
+                app_id,
+                lang=self.lang,
+                country=self.country,
+                sort=Sort.NEWEST,
+                count=page_size,
+                continuation_token=continuation_token
+            )
+            if not page:
+                return
+            yield page, continuation_token.token or ""
+
+FILE_FORMATS = ("jsonl", "csv")
+
+def parse_review_date(value) -> Optional[datetime]:
+    """Parse an ISO 8601 date into naive UTC like the scraper's dates; None if missing."""
+    if not value:
+        return None
+    date = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+def normalize_file_record(record: dict) -> dict:
+    """Map a record in scraper shape or in the /customer/reviews/export shape to scraper shape."""
+    return {
+        "userName": record.get("userName", record.get("name")),
+        "score": record.get("score", record.get("rating")),
+        "content": record.get("content"),
+        "at": parse_review_date(record.get("at", record.get("date"))),
+        "reviewId": record.get("reviewId", record.get("source_review_id")),
+    }
+
+class FileReviewSource(ReviewSource):
+    """Reviews streamed from a JSON Lines or CSV file, optionally gzip compressed.
+
+    The format comes from the extension (.jsonl/.ndjson/.csv, plus .gz) unless
+    given. The file is read one page at a time, so its size does not matter.
+    Records that cannot be parsed are logged and skipped.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str, file_format: Optional[str] = None,
+                 title: Optional[str] = None, description: str = ""):
+        self.path = path
+        self.file_format = file_format or self.detect_format(path)
+        if self.file_format not in FILE_FORMATS:
+            raise ValueError(f"Unsupported review file format '{self.file_format}'. Expected one of {', '.join(FILE_FORMATS)}")
+        self.title = title
+        self.description = description
+        self.skipped_count = 0
+
+    @staticmethod
+    def detect_format(path: str) -> str:
+        name = path[:-3] if path.endswith(".gz") else path
+        extension = os.path.splitext(name)[1].lstrip(".").lower()
+        return "jsonl" if extension in ("jsonl", "ndjson", "json") else extension
+
+    def open(self):
+        with open(self.path, "rb") as raw:
+            compressed = raw.read(2) == b"\x1f\x8b"
+        handle = gzip.open(self.path, "rb") if compressed else open(self.path, "rb")
+        return io.TextIOWrapper(handle, encoding="utf-8", newline="")
+
+    def app_details(self, app_id: str) -> dict:
+        return {"title": self.title or app_id, "description": self.description}
+
+    def iter_pages(self, app_id: str, page_size: int) -> Iterator[List[dict]]:
+        page = []
+        with self.open() as handle:
+            if self.file_format == "csv":
+                records = csv.DictReader(handle)
+            else:
+                records = (line for line in handle if line.strip())
+
+            for record in records:
+                try:
+                    if self.file_format == "jsonl":
+                        record = json.loads(record)
+                    page.append(normalize_file_record(record))
+                except (ValueError, TypeError, AttributeError) as e:
+                    self.skipped_count += 1
+                    logger.warning(f"Skipping unreadable review record in {self.path}: {str(e)}")
+                    continue
+
+                if len(page) >= page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+
+def default_review_source() -> ReviewSource:
+    return GooglePlaySource(
+        lang=current_app.config.get("GOOGLE_PLAY_LANG", "en"),
+        country=current_app.config.get("GOOGLE_PLAY_COUNTRY", "us")
+    )
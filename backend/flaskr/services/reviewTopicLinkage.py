@@ -1,14 +1,69 @@
-from typing import List, Tuple
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.decomposition import LatentDirichletAllocation
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Tuple
+from sqlalchemy import select
 from ..models import App, Review, Topic
+from .bulkUpdate import bulk_update_reviews
+from .modelRegistry import load_topic_model
+from ..metrics import count_reviews
 from .. import db, logger
 
-def get_topic_distribution(text: str, vectorizer: CountVectorizer, lda_model: LatentDirichletAllocation) -> List[float]:
-    X = vectorizer.transform([text])
-    return lda_model.transform(X)[0]
+if TYPE_CHECKING:
+    import numpy as np
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.decomposition import LatentDirichletAllocation
+
+# A review is linked only if its most likely topic beats this probability.
+TOPIC_PROBABILITY_THRESHOLD = 0.1
+
+def get_topic_distributions(texts: List[str], vectorizer: CountVectorizer, lda_model: LatentDirichletAllocation) -> np.ndarray:
+    X = vectorizer.transform(texts)
+    return lda_model.transform(X)
+
+def assign_topics(review_ids: List[int], texts: List[str], topic_ids: np.ndarray,
+                  vectorizer: CountVectorizer, lda_model: LatentDirichletAllocation) -> List[dict]:
+    """Pick each review's most likely topic for a whole batch in one transform."""
+    import numpy as np
+
+    distributions = get_topic_distributions(texts, vectorizer, lda_model)
+    # Components whose topic failed to save (id -1) can never be picked.
+    distributions[:, topic_ids < 0] = 0
+    best_topics = distributions.argmax(axis=1)
+    best_probabilities = distributions[np.arange(len(texts)), best_topics]
+    assigned = best_probabilities > TOPIC_PROBABILITY_THRESHOLD
+
+    return [
+        {"id": int(review_id), "topic_id": int(topic_id)}
+        for review_id, topic_id in zip(np.asarray(review_ids)[assigned], topic_ids[best_topics[assigned]])
+    ]
+
+def fit_topic_word_model(topics: List[Topic]) -> Tuple[CountVectorizer, LatentDirichletAllocation]:
+    """Fallback for apps without a stored model: fit a small LDA on the topic words themselves."""
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.decomposition import LatentDirichletAllocation
+
+    vectorizer = CountVectorizer(
+        max_df=0.5,
+        min_df=2,
+        stop_words='english',
+        max_features=1000
+    )
+    
+    lda_model = LatentDirichletAllocation(
+        n_components=len(topics),
+        max_iter=10,
+        learning_method='online',
+        random_state=42,
+        batch_size=128,
+        verbose=0
+    )
+    
+    X = vectorizer.fit_transform([topic.content for topic in topics])
+    lda_model.fit(X)
+    return vectorizer, lda_model
+
+def link_topics_reviews(app_id: str, batch_size: int = 5000) -> None:
+    import numpy as np
 
-def link_topics_reviews(app_id: str, batch_size: int = 500) -> None:
     try:
         app = App.query.get(app_id)
         if not app:
@@ -21,60 +76,48 @@ def link_topics_reviews(app_id: str, batch_size: int = 500) -> None:
             return
             
         
-        vectorizer = CountVectorizer(
-            max_df=0.5,
-            min_df=2,
-            stop_words='english',
-            max_features=1000
-        )
-        
-        lda_model = LatentDirichletAllocation(
-            n_components=len(topics),
-            max_iter=10,
-            learning_method='online',
-            random_state=42,
-            batch_size=128,
-            verbose=0
-        )
-        
-        
-        topic_contents = [topic.content for topic in topics]
-        X = vectorizer.fit_transform(topic_contents)
-        lda_model.fit(X)
-        
-       
-        total_reviews = Review.query.filter_by(app_id=app_id).count()
+        model = load_topic_model(app_id)
+        if model and set(model.topic_ids) - {None} == {topic.id for topic in topics}:
+            vectorizer, lda_model = model.vectorizer, model.lda_model
+            topic_ids = np.array([topic_id if topic_id is not None else -1 for topic_id in model.topic_ids])
+            use_cleaned_text = True
+        else:
+            logger.warning(f"No stored topic model matches the topics of app {app_id}. Fitting one on the topic words.")
+            vectorizer, lda_model = fit_topic_word_model(topics)
+            topic_ids = np.array([topic.id for topic in topics])
+            use_cleaned_text = False
+
+        total_reviews = Review.query.filter_by(app_id=app_id).filter(Review.topic_id.is_(None)).count()
         processed_count = 0
         skipped_count = 0
+        last_id = 0
         
-        while processed_count < total_reviews:
-            reviews_batch = Review.query.filter_by(app_id=app_id).offset(processed_count).limit(batch_size).all()
-            batch_skipped = 0
-            
-            for review in reviews_batch:
-                try:
-                    
-                    if len(review.content.split()) < 3 or review.topic_id is not None:
-                        continue
-                        
-                    
-                    topic_distribution = get_topic_distribution(review.content, vectorizer, lda_model)
-                    
-                    
-                    max_prob = max(topic_distribution)
-                    if max_prob > 0.1: 
-                        most_relevant_topic_id = topics[topic_distribution.argmax()].id
-                        review.topic_id = most_relevant_topic_id
-                    else:
-                        batch_skipped += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing review {review.id}: {str(e)}")
-                    batch_skipped += 1
-                    continue
+        while True:
+            reviews_batch = db.session.execute(
+                select(Review.id, Review.content, Review.cleaned_content)
+                .where(Review.app_id == app_id, Review.topic_id.is_(None), Review.id > last_id)
+                .order_by(Review.id)
+                .limit(batch_size)
+            ).all()
+            if not reviews_batch:
+                break
+            last_id = reviews_batch[-1].id
+
+            # The stored model was fit on cleaned text; reviews never preprocessed fall back to raw content.
+            candidates = [
+                (review.id, (review.cleaned_content or review.content) if use_cleaned_text else review.content)
+                for review in reviews_batch if len(review.content.split()) >= 3
+            ]
+            updates = []
+            if candidates:
+                review_ids, texts = zip(*candidates)
+                updates = assign_topics(list(review_ids), list(texts), topic_ids, vectorizer, lda_model)
+            batch_skipped = len(candidates) - len(updates)
             
             try:
+                bulk_update_reviews(updates)
                 db.session.commit()
+                count_reviews("topic_linkage", len(reviews_batch))
                 skipped_count += batch_skipped
                 processed_count += len(reviews_batch)
                 logger.info(f"Processed {processed_count}/{total_reviews} reviews for app {app_id}. "
@@ -1,46 +1,106 @@
-from textblob import TextBlob
+from functools import partial
+from typing import Iterator, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import select
 from ..models import Review
+from .bulkUpdate import bulk_update_reviews
+from .processPool import map_in_order, pool_workers
+from ..metrics import count_reviews
 from .. import db, logger
 
-def analyze_sentiment(app_id: str, batch_size: int = 500):
+# Scorer libraries are imported on first use; they are slow to import and
+# only pipeline workers need them.
+_text_blob = None
+_vader_analyzer = None
+
+def score_textblob(text: str) -> float:
+    global _text_blob
+    if _text_blob is None:
+        from textblob import TextBlob
+        _text_blob = TextBlob
+    return _text_blob(text).sentiment.polarity
+
+def score_vader(text: str) -> float:
+    global _vader_analyzer
+    if _vader_analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _vader_analyzer = SentimentIntensityAnalyzer()
+    return _vader_analyzer.polarity_scores(text)["compound"]
+
+# Both scorers return a polarity in [-1, 1]. VADER is lexicon-only and several
+# times faster; TextBlob is the original (and default) scorer.
+SCORERS = {
+    "textblob": score_textblob,
+    "vader": score_vader,
+}
+
+def resolve_scorer(scorer: Optional[str] = None) -> str:
+    """Return scorer, or the configured SENTIMENT_SCORER, after checking it exists. Needs an app context."""
+    scorer = scorer or current_app.config.get("SENTIMENT_SCORER", "textblob")
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown sentiment scorer '{scorer}'. Expected one of {', '.join(SCORERS)}")
+    return scorer
+
+def score_chunk(chunk: List[Tuple[int, str]], scorer: str) -> List[dict]:
+    """Score (id, content) pairs. Runs inside pool workers, so it only touches plain data."""
+    score = SCORERS[scorer]
+    results = []
+    for review_id, content in chunk:
+        try:
+            results.append({"id": review_id, "sentiment_score": round(score(content), 1)})
+        except Exception as e:
+            logger.error(f"Error processing review {review_id}: {str(e)}")
+    return results
+
+def iter_review_chunks(app_id: str, chunk_size: int, only_missing: bool = False) -> Iterator[List[Tuple[int, str]]]:
+    """Stream (id, content) pairs for an app in id order, one chunk per query.
+
+    Keyset paging on id keeps memory flat and, unlike a server-side cursor,
+    survives the commit issued after each chunk is written back.
+    """
+    last_id = 0
+    while True:
+        query = select(Review.id, Review.content)\
+            .where(Review.app_id == app_id, Review.id > last_id)
+        if only_missing:
+            query = query.where(Review.sentiment_score.is_(None))
+
+        chunk = db.session.execute(query.order_by(Review.id).limit(chunk_size)).all()
+        if not chunk:
+            return
+        last_id = chunk[-1].id
+        yield [(review_id, content) for review_id, content in chunk]
+
+def analyze_sentiment(app_id: str, batch_size: int = 500, only_missing: bool = False,
+                      scorer: Optional[str] = None, workers: Optional[int] = None):
     try:
-        
-        reviews = Review.query.filter_by(app_id=app_id).all()
-        
-        if not reviews:
+        scorer = resolve_scorer(scorer)
+        workers = pool_workers(workers or current_app.config.get("SENTIMENT_WORKERS"))
+
+        count_query = Review.query.filter_by(app_id=app_id)
+        if only_missing:
+            count_query = count_query.filter(Review.sentiment_score.is_(None))
+        total_reviews = count_query.count()
+
+        if not total_reviews:
             logger.warning(f"No reviews found for app_id: {app_id}")
             return
-            
+
+        if total_reviews <= batch_size:
+            workers = 1
+
         processed_count = 0
-        total_reviews = len(reviews)
-        
-        for review in reviews:
-            try:
-                
-                blob = TextBlob(review.content)
-                sentiment_score = round(blob.sentiment.polarity, 1)
-                
-                
-                review.sentiment_score = sentiment_score
-                db.session.add(review)
-                processed_count += 1
-                
-                
-                if processed_count % batch_size == 0:
-                    db.session.commit()
-                    logger.info(f"Processed {processed_count}/{total_reviews} reviews for app_id: {app_id}")
-                
-            except Exception as e:
-                logger.error(f"Error processing review {review.id}: {str(e)}")
-                continue
-        
-        
-        if processed_count % batch_size != 0:
+        chunks = iter_review_chunks(app_id, batch_size, only_missing)
+        for _, scores in map_in_order(partial(score_chunk, scorer=scorer), chunks, list, workers):
+            bulk_update_reviews(scores)
             db.session.commit()
-            
-        logger.info(f"Successfully analyzed sentiments for app_id: {app_id}. Processed {processed_count}/{total_reviews} reviews")
-        
+            count_reviews("sentiment_analysis", len(scores))
+            processed_count += len(scores)
+            logger.info(f"Processed {processed_count}/{total_reviews} reviews for app_id: {app_id}")
+
+        logger.info(f"Successfully analyzed sentiments for app_id: {app_id} with {scorer}. Processed {processed_count}/{total_reviews} reviews")
+
     except Exception as e:
         db.session.rollback()
         logger.error(f"Critical error in sentiment analysis for app_id {app_id}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
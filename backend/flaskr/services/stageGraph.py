@@ -0,0 +1,143 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+from ..metrics import observe_stage
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[["StageGraph"], Optional[dict]]
+    after: Tuple[str, ...] = ()
+    # A stage that consumes another's output while it is still being produced
+    # starts as soon as that stage has first reported progress, instead of
+    # after it finishes.
+    streams_from: Optional[str] = None
+
+@dataclass
+class StageState:
+    started: bool = False
+    finished: threading.Event = field(default_factory=threading.Event)
+    progress: threading.Event = field(default_factory=threading.Event)
+    produced: bool = False
+    failed: bool = False
+    error: Optional[str] = None
+    result: dict = field(default_factory=dict)
+
+class StageGraph:
+    """Runs pipeline stages in threads as soon as the stages they depend on allow.
+
+    Every stage emits started and completed/failed events to the status queue,
+    like the sequential pipeline did. A stage's run(graph) may return extra
+    fields for its completed event; {"skipped": True} counts as skipped in the
+    metrics. After a failure no further stages start, and run() returns once
+    the running ones have finished. on_completed(name) runs in the stage's app
+    context before its completed event, e.g. to checkpoint it.
+    """
+
+    def __init__(self, app, status_queue, on_completed: Optional[Callable[[str], None]] = None):
+        self.app = app
+        self.status_queue = status_queue
+        self.on_completed = on_completed
+        self.stages: Dict[str, Stage] = {}
+        self.states: Dict[str, StageState] = {}
+        self._changed = threading.Condition()
+
+    def add(self, name: str, run: Callable[["StageGraph"], Optional[dict]], after: Tuple[str, ...] = (),
+            streams_from: Optional[str] = None) -> None:
+        for dependency in (*after, *([streams_from] if streams_from else [])):
+            if dependency not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+        self.stages[name] = Stage(name, run, tuple(after), streams_from)
+        self.states[name] = StageState()
+
+    def skip(self, name: str, result: Optional[dict] = None) -> None:
+        """Treat a stage as completed by an earlier run of the job, e.g. when resuming it."""
+        state = self.states[name]
+        state.started = state.produced = True
+        state.result = result or {}
+        state.finished.set()
+        self.status_queue.put({"stage": name, "status": "completed", "resumed": True, **state.result})
+
+    def result(self, name: str) -> dict:
+        return self.states[name].result
+
+    def finished(self, name: str) -> threading.Event:
+        """Set once the stage has completed or failed."""
+        return self.states[name].finished
+
+    def progress(self, name: str) -> threading.Event:
+        """Set by the stage whenever it has committed new output; consumers clear it."""
+        return self.states[name].progress
+
+    def failed(self, name: str) -> bool:
+        return self.states[name].failed
+
+    def error(self, name: str) -> Optional[str]:
+        """The message the stage failed with, or None."""
+        return self.states[name].error
+
+    def notify_progress(self, name: str) -> None:
+        with self._changed:
+            self.states[name].produced = True
+            self.states[name].progress.set()
+            self._changed.notify_all()
+
+    def _ready(self, stage: Stage) -> bool:
+        if not all(self.states[name].finished.is_set() and not self.states[name].failed for name in stage.after):
+            return False
+        if stage.streams_from is None:
+            return True
+        source = self.states[stage.streams_from]
+        return source.produced or source.finished.is_set()
+
+    def _run_stage(self, stage: Stage) -> None:
+        state = self.states[stage.name]
+        try:
+            with self.app.app_context():
+                try:
+                    self.status_queue.put({"stage": stage.name, "status": "started"})
+                    with observe_stage(stage.name) as outcome:
+                        state.result = stage.run(self) or {}
+                        if state.result.get("skipped"):
+                            outcome["status"] = "skipped"
+                    if self.on_completed:
+                        self.on_completed(stage.name)
+                    self.status_queue.put({"stage": stage.name, "status": "completed", **state.result})
+                except Exception as e:
+                    logger.error(f"Stage {stage.name} failed: {str(e)}", exc_info=True)
+                    state.failed = True
+                    state.error = str(e)
+                    self.status_queue.put({"stage": stage.name, "status": "failed", "error": str(e)})
+        finally:
+            with self._changed:
+                state.finished.set()
+                state.progress.set()
+                self._changed.notify_all()
+
+    def run(self) -> bool:
+        """Run every stage and return whether all of them completed."""
+        threads = []
+        with self._changed:
+            while True:
+                failed = any(state.failed for state in self.states.values())
+                if not failed:
+                    for stage in self.stages.values():
+                        state = self.states[stage.name]
+                        if not state.started and self._ready(stage):
+                            state.started = True
+                            thread = threading.Thread(target=self._run_stage, args=(stage,), name=f"stage-{stage.name}")
+                            thread.daemon = True
+                            thread.start()
+                            threads.append(thread)
+
+                running = [state for state in self.states.values() if state.started and not state.finished.is_set()]
+                if not running:
+                    break
+                self._changed.wait()
+
+        for thread in threads:
+            thread.join()
+        return all(state.finished.is_set() and not state.failed for state in self.states.values())
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func, insert, delete, Date
+from ..models import Review, AppStats, AppDailyStats, TopicStats
+from .. import db, logger
+
+RATINGS = range(1, 6)
+
+def empty_totals() -> Dict:
+    totals = {"review_count": 0, "rating_sum": 0, "sentiment_sum": 0.0, "sentiment_count": 0}
+    for rating in RATINGS:
+        totals[f"rating_{rating}_count"] = 0
+    return totals
+
+def add_to_totals(totals: Dict, rating: int, review_count: int, sentiment_sum: Optional[float], sentiment_count: int) -> None:
+    totals["review_count"] += review_count
+    totals["rating_sum"] += rating * review_count
+    totals[f"rating_{rating}_count"] += review_count
+    totals["sentiment_sum"] += sentiment_sum or 0.0
+    totals["sentiment_count"] += sentiment_count
+
+def refresh_review_stats(app_id: str) -> None:
+    """Rebuild the app's rating and sentiment rollups (overall and per day) from one grouped scan."""
+    try:
+        day = func.date(Review.date, type_=Date).label("day")
+        rows = db.session.query(
+            day,
+            Review.rating,
+            func.count(Review.id),
+            func.sum(Review.sentiment_score),
+            func.count(Review.sentiment_score)
+        ).filter(Review.app_id == app_id)\
+         .group_by(day, Review.rating)\
+         .all()
+
+        app_totals = empty_totals()
+        daily_totals = {}
+        for review_day, rating, review_count, sentiment_sum, sentiment_count in rows:
+            add_to_totals(app_totals, rating, review_count, sentiment_sum, sentiment_count)
+            add_to_totals(daily_totals.setdefault(review_day, empty_totals()), rating, review_count, sentiment_sum, sentiment_count)
+
+        db.session.execute(delete(AppDailyStats).where(AppDailyStats.app_id == app_id))
+        if daily_totals:
+            db.session.execute(
+                insert(AppDailyStats.__table__),
+                [{"app_id": app_id, "day": review_day, **totals} for review_day, totals in daily_totals.items()]
+            )
+        db.session.merge(AppStats(app_id=app_id, updated_at=datetime.utcnow(), **app_totals))
+        db.session.commit()
+
+        logger.info(f"Refreshed review statistics for app {app_id}: {app_totals['review_count']} reviews over {len(daily_totals)} days")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error refreshing review statistics for app {app_id}: {str(e)}")
+        raise
+
+def refresh_topic_stats(app_id: str) -> None:
+    """Rebuild the per-topic review counts of the app."""
+    try:
+        rows = db.session.query(Review.topic_id, func.count(Review.id))\
+            .filter(Review.app_id == app_id, Review.topic_id.isnot(None))\
+            .group_by(Review.topic_id)\
+            .all()
+
+        db.session.execute(delete(TopicStats).where(TopicStats.app_id == app_id))
+        if rows:
+            db.session.execute(
+                insert(TopicStats.__table__),
+                [{"topic_id": topic_id, "app_id": app_id, "review_count": review_count} for topic_id, review_count in rows]
+            )
+        db.session.commit()
+
+        logger.info(f"Refreshed topic statistics for app {app_id}: {len(rows)} topics")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error refreshing topic statistics for app {app_id}: {str(e)}")
+        raise
@@ -0,0 +1,92 @@
+import re
+from functools import lru_cache
+from typing import List, Optional
+from .. import logger
+
+NON_LETTERS = re.compile(r'[^a-zA-Z\s]')
+
+# NLTK data clean_text needs, by nltk.data path and download name.
+NLTK_RESOURCES = {
+    'tokenizers/punkt': 'punkt',
+    'tokenizers/punkt_tab': 'punkt_tab',
+    'corpora/stopwords': 'stopwords',
+    'corpora/wordnet': 'wordnet',
+}
+
+class TextResourcesMissing(RuntimeError):
+    pass
+
+# Per-process NLTK state, built once by init_text_worker instead of per review.
+_missing_nltk_data: Optional[List[str]] = None
+_stop_words = None
+_lemmatizer = None
+_word_tokenize = None
+
+def ensure_nltk_data() -> None:
+    """Download whatever NLTK data is missing, raising TextResourcesMissing if that fails.
+
+    Checked once per process, so an offline worker neither retries the
+    download nor reports it for every review.
+    """
+    global _missing_nltk_data
+    if _missing_nltk_data is None:
+        import nltk
+        missing = []
+        for path, name in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                nltk.download(name, quiet=True)
+                try:
+                    nltk.data.find(path)
+                except LookupError:
+                    missing.append(name)
+        _missing_nltk_data = missing
+    if _missing_nltk_data:
+        raise TextResourcesMissing(
+            f"NLTK data {', '.join(_missing_nltk_data)} is missing and could not be downloaded. "
+            f"Install it with `python -m nltk.downloader {' '.join(_missing_nltk_data)}` or run `flask warm-up` online."
+        )
+
+def init_text_worker() -> None:
+    """Build this process' stopword set, lemmatizer and tokenizer, once."""
+    global _stop_words, _lemmatizer, _word_tokenize
+    if _stop_words is None:
+        ensure_nltk_data()
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+        from nltk.tokenize import word_tokenize
+        _lemmatizer = WordNetLemmatizer()
+        _word_tokenize = word_tokenize
+        _stop_words = frozenset(stopwords.words('english'))
+
+def warm_text_worker() -> None:
+    # A failed initializer breaks the whole pool with an opaque error; log
+    # instead and let the first clean_text raise the real one from its task.
+    try:
+        init_text_worker()
+    except Exception as e:
+        logger.error(f"Error loading text preprocessing resources: {str(e)}")
+
+@lru_cache(maxsize=100000)
+def lemmatize(token: str) -> str:
+    # Review vocabularies are small and repetitive, so most lookups hit the cache.
+    return _lemmatizer.lemmatize(token)
+
+def clean_text(text: str) -> Optional[str]:
+    """Lowercase, tokenize, drop stopwords and lemmatize text.
+
+    Missing NLTK data raises TextResourcesMissing, which fails the whole pass
+    rather than every review; other errors give None for this text only.
+    """
+    init_text_worker()
+    try:
+        tokens = _word_tokenize(NON_LETTERS.sub('', text.lower()))
+        cleaned_tokens = [lemmatize(token) for token in tokens if token not in _stop_words and len(token) > 2]
+        return ' '.join(cleaned_tokens)
+    except Exception as e:
+        logger.error(f"Error cleaning text: {str(e)}")
+        return None
+
+def needs_preprocessing(language: Optional[str], cleaned_content: Optional[str]) -> bool:
+    return language is None or (language == 'en' and cleaned_content is None)
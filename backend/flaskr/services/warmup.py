@@ -0,0 +1,54 @@
+import time
+from typing import Dict
+from flask import current_app
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+WARM_UP_TEXT = "The latest update made the app crash every time I open it, please fix this."
+
+def warm_text_preprocessing() -> None:
+    from .textPreprocessing import init_text_worker, clean_text
+    init_text_worker()
+    # WordNet and the tokenizer models load on first use, not on import.
+    clean_text(WARM_UP_TEXT)
+
+def warm_language_detection() -> None:
+    from .languageDetection import full_detect_language
+    full_detect_language(WARM_UP_TEXT)
+
+def warm_sentiment() -> None:
+    from .sentimentAnalysis import SCORERS
+    SCORERS[current_app.config.get("SENTIMENT_SCORER", "textblob")](WARM_UP_TEXT)
+
+def warm_topic_models() -> None:
+    # Imports scikit-learn, which brings numpy, scipy and joblib with it.
+    from .topicExtraction import initialize_models
+    initialize_models(1)
+
+WARM_UP_STEPS = {
+    "text_preprocessing": warm_text_preprocessing,
+    "language_detection": warm_language_detection,
+    "sentiment": warm_sentiment,
+    "topic_models": warm_topic_models,
+}
+
+def warm_up_pipeline() -> Dict[str, float]:
+    """Load the NLP/ML libraries, data and models the pipeline would otherwise load on first use.
+
+    The web process starts without them; call this in a worker before it takes
+    jobs (the processing pool does so when it starts) so the first job does not
+    pay for it. Needs an app context. Returns the seconds each step took;
+    failed steps are logged and skipped.
+    """
+    timings = {}
+    for name, warm_up in WARM_UP_STEPS.items():
+        start = time.perf_counter()
+        try:
+            warm_up()
+        except Exception as e:
+            logger.error(f"Warm-up step {name} failed: {str(e)}")
+            continue
+        timings[name] = round(time.perf_counter() - start, 3)
+    logger.info(f"Warmed up pipeline in {sum(timings.values()):.2f}s: {timings}")
+    return timings
@@ -5,5 +5,6 @@ export FLASK_APP=flaskr
 export FLASK_ENV=development
 export FLASK_DEBUG=1
 
-# Run Flask app
+# Run Flask app; like wsgi.py (gunicorn wsgi:app) it starts the processing
+# workers and resumes the jobs a dead server left behind
 python3 -m flask run
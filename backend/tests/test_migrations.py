@@ -0,0 +1,75 @@
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import create_engine, inspect, text
+from flaskr import db, models  # noqa: F401 (registers the tables create_all builds)
+from flaskr.migrations import MIGRATIONS, migrate_schema, check_schema
+
+# The tables as the first release created them, before any migration existed.
+BASELINE_SCHEMA = [
+    """CREATE TABLE application (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        description TEXT NOT NULL
+    )""",
+    """CREATE TABLE topic (
+        id INTEGER NOT NULL PRIMARY KEY,
+        app_id VARCHAR NOT NULL REFERENCES application (id) ON DELETE CASCADE,
+        content TEXT NOT NULL
+    )""",
+    """CREATE TABLE review (
+        id INTEGER NOT NULL PRIMARY KEY,
+        app_id VARCHAR NOT NULL REFERENCES application (id) ON DELETE CASCADE,
+        name VARCHAR(50) NOT NULL,
+        rating INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        date DATETIME NOT NULL,
+        topic_id INTEGER REFERENCES topic (id) ON DELETE SET NULL,
+        sentiment_score FLOAT
+    )""",
+]
+
+def make_app(database_uri):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    db.init_app(app)
+    return app
+
+def test_migrate_schema_upgrades_baseline_database(tmp_path):
+    database_uri = f"sqlite:///{tmp_path / 'baseline.db'}"
+    engine = create_engine(database_uri)
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO application VALUES ('com.example', 'Example', '')"))
+        connection.execute(
+            text("INSERT INTO review (app_id, name, rating, content, date) VALUES ('com.example', 'a', 5, 'Great', :date)"),
+            {"date": datetime(2024, 1, 1)}
+        )
+    engine.dispose()
+
+    app = make_app(database_uri)
+    with app.app_context():
+        applied = migrate_schema()
+        assert applied == [version for version, _ in MIGRATIONS]
+        check_schema()
+
+        inspector = inspect(db.engine)
+        review_columns = {column["name"] for column in inspector.get_columns("review")}
+        assert {"language", "cleaned_content", "source_review_id"} <= review_columns
+        assert "reviews_complete_through" in {column["name"] for column in inspector.get_columns("application")}
+        assert "full_refresh" in {column["name"] for column in inspector.get_columns("processing_job")}
+
+        review_indexes = {index["name"]: index for index in inspector.get_indexes("review")}
+        assert {"ix_review_app_date", "ix_review_app_rating_date", "ix_review_app_topic_date",
+                "ix_review_app_id", "ux_review_app_source_review_id"} <= set(review_indexes)
+        assert review_indexes["ux_review_app_source_review_id"]["unique"]
+        assert "ix_topic_app_id" in {index["name"] for index in inspector.get_indexes("topic")}
+
+        assert db.session.execute(text("SELECT count(*) FROM review")).scalar() == 1
+        assert migrate_schema() == []
+
+def test_migrate_schema_on_new_database(tmp_path):
+    app = make_app(f"sqlite:///{tmp_path / 'new.db'}")
+    with app.app_context():
+        assert migrate_schema() == [version for version, _ in MIGRATIONS]
+        check_schema()
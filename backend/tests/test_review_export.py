@@ -0,0 +1,24 @@
+import pytest
+from benchmarks.harness import create_benchmark_app
+from benchmarks.stubPlayStore import StubPlayStore
+from flaskr.models import Review
+from flaskr.services.reviewExport import iter_review_export
+from flaskr.services.reviewExtraction import extract_reviews, import_reviews
+from flaskr.services.reviewSources import FileReviewSource
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_benchmark_app(f"sqlite:///{tmp_path / 'export.db'}")
+    with app.app_context():
+        yield app
+
+@pytest.mark.parametrize("export_format, extension", [("ndjson", "jsonl"), ("csv", "csv")])
+def test_reimported_export_adds_no_reviews(app, tmp_path, export_format, extension):
+    extract_reviews("com.example", source=StubPlayStore("com.example", 250))
+    stored = Review.query.filter_by(app_id="com.example").count()
+
+    path = tmp_path / f"reviews.{extension}"
+    path.write_text("".join(iter_review_export("com.example", export_format)), encoding="utf-8")
+
+    assert import_reviews("com.example", FileReviewSource(str(path))) == 0
+    assert Review.query.filter_by(app_id="com.example").count() == stored == 250
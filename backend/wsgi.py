@@ -0,0 +1,21 @@
+"""WSGI entry point: one app object per server process, e.g.
+
+    WEB_CONCURRENCY=4 CACHE_BACKEND=redis gunicorn wsgi:app
+
+gunicorn takes its worker count from WEB_CONCURRENCY, and the app reads it
+too: the in-process response cache cannot be shared between workers, so it
+is disabled when there are several and CACHE_BACKEND should be redis.
+
+Every request, processing worker and stage thread reuses this app; set
+WARM_UP_ON_STARTUP=true so each process loads the NLP/ML libraries in the
+background right away instead of on its first job. Serving processes also
+take over the jobs dead ones left behind, as `flask run` does; other ways
+of running the app (other flask commands, benchmarks) leave those to
+`flask resume-jobs`.
+"""
+from flaskr import create_app
+from flaskr.routes.processing import process_app
+from flaskr.services.jobQueue import start_worker_pool
+
+app = create_app()
+start_worker_pool(app, process_app)